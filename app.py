@@ -4,7 +4,6 @@
 # SPDX-License-Identifier: BSD 2-Clause License
 #
 
-import aiohttp
 import os
 import subprocess
 from contextlib import asynccontextmanager
@@ -13,30 +12,134 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, RedirectResponse
 from loguru import logger
 import sys
-import threading
 from queue import Queue
 import asyncio
-from tavus import TavusVideoService
+import bisect
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from bot_logs import BotLogMultiplexer
+from bot_runner import BotRunnerPool
+from bot_worker_pool import BotWorkerPool
+from bot_zygote import BotZygote
+from conversation_pool import ConversationPool
+from tavus import start_conversation
+from tavus_api import RequestScheduler, TavusApiClient, background_requests
 
 MAX_BOTS_PER_ROOM = 5
 
+# Conversations created ahead of time, and how long they may stay unused.
+# Off by default: a pool keeps creating and ending conversations, using
+# Tavus concurrency quota, even while nobody is connected.
+TAVUS_POOL_SIZE = int(os.getenv("TAVUS_POOL_SIZE", 0))
+TAVUS_POOL_TTL = float(os.getenv("TAVUS_POOL_TTL", 120))
+
+# Tavus API calls per second, and burst, allowed for our API key
+TAVUS_API_RATE = float(os.getenv("TAVUS_API_RATE", 5))
+TAVUS_API_BURST = int(os.getenv("TAVUS_API_BURST", 10))
+
+# How bots are started: "process" starts each bot from scratch, "worker"
+# hands conversations to idle pre-started workers, "zygote" forks bots
+# from a template process that has loaded everything once and "inprocess"
+# runs many bots as sessions in shared runner processes
+BOT_SPAWN_MODE = os.getenv("BOT_SPAWN_MODE", "worker")
+
+# Idle bot workers with pipecat imported and the VAD model loaded
+BOT_WORKER_POOL_SIZE = int(os.getenv("BOT_WORKER_POOL_SIZE", 2))
+
+# Runner processes for in-process bots, and sessions per runner. Bots
+# beyond that are started as processes.
+BOT_RUNNERS = int(os.getenv("BOT_RUNNERS", 2))
+BOT_RUNNER_MAX_SESSIONS = int(os.getenv("BOT_RUNNER_MAX_SESSIONS", 10))
+
+# Threads that start bot processes, so spawning doesn't block the event loop
+BOT_SPAWN_THREADS = int(os.getenv("BOT_SPAWN_THREADS", 4))
+
+# Reaper settings: how often to look for dead or stuck bots, how long a bot
+# may run, and how many of their conversations to end per sweep and at once
+REAPER_INTERVAL = float(os.getenv("REAPER_INTERVAL", 30))
+BOT_MAX_LIFETIME = float(os.getenv("BOT_MAX_LIFETIME", 3600))
+REAPER_BATCH_SIZE = int(os.getenv("REAPER_BATCH_SIZE", 20))
+REAPER_CONCURRENCY = int(os.getenv("REAPER_CONCURRENCY", 5))
+
 # Bot sub-process dict for status reporting and concurrency control
 bot_procs = {}
-tavus_session = None
+tavus_client = None
+conversation_pool = None
+bot_worker_pool = None
+bot_zygote = None
+bot_zygote_process = None
+# So concurrent requests don't both restart the zygote
+bot_zygote_lock = asyncio.Lock()
+bot_runner_pool = None
+reaper_task = None
+# Conversations being ended in the background
+end_tasks = set()
+
+# Output of every bot, read on the event loop
+bot_logs = BotLogMultiplexer()
+
+bot_spawn_executor = ThreadPoolExecutor(BOT_SPAWN_THREADS, thread_name_prefix="bot-spawn")
+
+
+class TavusConversation(NamedTuple):
+    conversation_id: str
+    room_url: str
+    persona_name: str
+
+
+class BotProcess(NamedTuple):
+    proc: subprocess.Popen
+    room_url: str
+    conversation_id: str
+    started_at: float
+    reaped: bool = False
+
+
+class LatencyHistogram:
+    """Durations counted in cumulative buckets, like a Prometheus histogram"""
+
+    BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self._counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self._total = 0.0
+        self._max = 0.0
+
+    def observe(self, seconds):
+        ms = seconds * 1000
+        self._counts[bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+        self._total += ms
+        self._max = max(self._max, ms)
+
+    @property
+    def stats(self):
+        count = sum(self._counts)
+        buckets = {}
+        cumulative = 0
+        for bucket, bucket_count in zip((*self.BUCKETS_MS, "+Inf"), self._counts):
+            cumulative += bucket_count
+            buckets[str(bucket)] = cumulative
+        return {
+            "count": count,
+            "mean_ms": self._total / count if count else 0.0,
+            "max_ms": self._max,
+            "le_ms": buckets,
+        }
+
+
+# Time to start a bot, per way it was started
+bot_spawn_latency = defaultdict(LatencyHistogram)
 
 # Configure logging
 logger.remove()
 logger.add(sys.stdout, format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level}</level> | <cyan>SERVER</cyan>: {message}")
 
-def log_stream(stream, prefix):
-    """Read and log a stream (stdout/stderr) with a prefix"""
-    for line in iter(stream.readline, ''):
-        if line:
-            logger.info(f"{prefix}: {line.strip()}")
-
 def cleanup():
     for entry in bot_procs.values():
-        proc = entry[0]
+        proc = entry.proc
         try:
             proc.terminate()
             proc.wait(timeout=5)
@@ -44,13 +147,114 @@ def cleanup():
             proc.kill()
             proc.wait()
 
+def find_orphaned_bots():
+    """Bots that crashed, or have been running for too long, and whose
+    conversation hasn't been ended yet. Drops the bots that are done with"""
+    now = time.monotonic()
+    orphans = []
+    for pid, entry in list(bot_procs.items()):
+        returncode = entry.proc.poll()
+        if entry.reaped:
+            # Stuck bots are reaped while still shutting down
+            if returncode is not None:
+                del bot_procs[pid]
+        elif returncode is None and now - entry.started_at > BOT_MAX_LIFETIME:
+            logger.warning(f"Bot {pid} has been running for too long, terminating it")
+            entry.proc.terminate()
+            orphans.append(pid)
+        elif returncode:
+            orphans.append(pid)
+        elif returncode == 0:
+            # Bots that exit cleanly end their own conversation
+            del bot_procs[pid]
+    return orphans
+
+async def reap_bots():
+    """End the conversations of orphaned bots, a batch at a time"""
+    orphans = find_orphaned_bots()[:REAPER_BATCH_SIZE]
+    if not orphans:
+        return
+
+    logger.info(f"Reaping {len(orphans)} orphaned bot conversations")
+    semaphore = asyncio.Semaphore(REAPER_CONCURRENCY)
+
+    async def reap(pid, entry):
+        async with semaphore:
+            try:
+                with background_requests():
+                    await tavus_client.end_conversation(entry.conversation_id)
+                logger.info(f"Ended conversation {entry.conversation_id} of bot {pid}")
+            except Exception as e:
+                logger.error(f"Error ending conversation {entry.conversation_id} of bot {pid}: {e}")
+        if bot_procs.get(pid) is entry and entry.proc.poll() is not None:
+            del bot_procs[pid]
+
+    # Marked before ending the conversations, even though that may fail:
+    # they may already be gone, and Tavus times out the rest. Ending them can
+    # take a while, and a pid may be reused by a new bot meanwhile.
+    entries = {}
+    for pid in orphans:
+        entries[pid] = bot_procs[pid] = bot_procs[pid]._replace(reaped=True)
+    await asyncio.gather(*(reap(pid, entry) for pid, entry in entries.items()))
+
+async def reaper_task_handler():
+    while True:
+        await asyncio.sleep(REAPER_INTERVAL)
+        try:
+            await reap_bots()
+        except Exception as e:
+            logger.error(f"Error reaping bots: {e}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global tavus_session
-    tavus_session = aiohttp.ClientSession()
+    global tavus_client, conversation_pool, bot_worker_pool, bot_zygote, bot_zygote_process
+    global bot_runner_pool, reaper_task
+    bot_logs.start()
+    # One client, connection pool and rate limit shared by every request
+    tavus_client = TavusApiClient(
+        api_key=os.getenv("TAVUS_API_KEY"),
+        scheduler=RequestScheduler(rate=TAVUS_API_RATE, burst=TAVUS_API_BURST),
+    )
+    conversation_pool = ConversationPool(
+        create=create_tavus_conversation,
+        end=end_tavus_conversation,
+        size=TAVUS_POOL_SIZE,
+        ttl=TAVUS_POOL_TTL,
+    )
+    await conversation_pool.start()
+    if BOT_SPAWN_MODE == "worker" and BOT_WORKER_POOL_SIZE > 0:
+        bot_worker_pool = BotWorkerPool(spawn=start_bot_worker, size=BOT_WORKER_POOL_SIZE)
+        await bot_worker_pool.start()
+    elif BOT_SPAWN_MODE == "zygote":
+        # Bots are started from scratch until the zygote is ready
+        socket_path = os.path.join(tempfile.mkdtemp(prefix="bot-zygote-"), "zygote.sock")
+        bot_zygote_process = await start_bot_zygote(socket_path)
+        bot_zygote = BotZygote(socket_path=socket_path)
+    elif BOT_SPAWN_MODE == "inprocess":
+        bot_runner_pool = BotRunnerPool(
+            spawn=start_bot_runner, size=BOT_RUNNERS, max_sessions=BOT_RUNNER_MAX_SESSIONS
+        )
+        await bot_runner_pool.start()
+    reaper_task = asyncio.create_task(reaper_task_handler())
     yield
-    await tavus_session.close()
-    cleanup()
+    reaper_task.cancel()
+    await conversation_pool.stop()
+    if bot_worker_pool:
+        await bot_worker_pool.stop()
+    if end_tasks:
+        await asyncio.gather(*end_tasks)
+    await tavus_client.close()
+    loop = asyncio.get_running_loop()
+    # Off the event loop, which keeps reading the bots' output meanwhile
+    await loop.run_in_executor(bot_spawn_executor, cleanup)
+    if bot_zygote_process:
+        # After cleanup(): only the zygote can report its bots' exit codes
+        bot_zygote_process.stdin.close()
+        await loop.run_in_executor(bot_spawn_executor, bot_zygote_process.wait)
+    if bot_runner_pool:
+        await bot_runner_pool.stop()
+    await bot_logs.stop()
+    bot_spawn_executor.shutdown()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -62,82 +266,182 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-async def get_tavus_room():
-    """Initialize Tavus and get room URL"""
+async def create_tavus_conversation(background: bool) -> TavusConversation:
+    """Create a Tavus conversation and look up its persona name at the same
+    time. Pool refills run in the background, behind requests users are
+    waiting on"""
+    if background:
+        with background_requests():
+            return await start_tavus_conversation()
+    return await start_tavus_conversation()
+
+async def start_tavus_conversation() -> TavusConversation:
+    conversation, persona = await start_conversation(
+        tavus_client, os.getenv("TAVUS_REPLICA_ID"), os.getenv("TAVUS_PERSONA_ID", "p2fbd605")
+    )
+    return TavusConversation(
+        conversation["conversation_id"], conversation["conversation_url"], persona["persona_name"]
+    )
+
+async def end_abandoned_conversation(conversation_id):
+    """End a conversation no bot will join, logging rather than raising errors"""
     try:
-        tavus = TavusVideoService(
-            api_key=os.getenv("TAVUS_API_KEY"),
-            replica_id=os.getenv("TAVUS_REPLICA_ID"),
-            persona_id=os.getenv("TAVUS_PERSONA_ID", "p2fbd605"),
-            session=tavus_session,
-        )
-        
-        persona_name = await tavus.get_persona_name()
-        room_url = await tavus.initialize()
-        logger.info(f"Got room URL from Tavus: {room_url}")
-        logger.info(f"Persona name: {persona_name}")
-        
-        return room_url, persona_name
+        with background_requests():
+            await tavus_client.end_conversation(conversation_id)
+    except Exception as e:
+        logger.error(f"Error ending Tavus conversation {conversation_id}: {e}")
+
+def end_conversation_in_background(conversation_id):
+    task = asyncio.create_task(end_abandoned_conversation(conversation_id))
+    end_tasks.add(task)
+    task.add_done_callback(end_tasks.discard)
+
+async def end_tavus_conversation(conversation: TavusConversation):
+    """End a Tavus conversation that was never handed out"""
+    logger.info(f"Ending unused Tavus conversation {conversation.conversation_id}")
+    with background_requests():
+        await tavus_client.end_conversation(conversation.conversation_id)
+
+async def get_tavus_room() -> TavusConversation:
+    """Get a Tavus conversation, from the pool when one is ready"""
+    try:
+        conversation = await conversation_pool.acquire()
+        logger.info(f"Got room URL from Tavus: {conversation.room_url}")
+        logger.info(f"Persona name: {conversation.persona_name}")
+
+        return conversation
     except Exception as e:
         logger.error(f"Error getting Tavus room: {e}")
         raise
 
-async def run_bot_process(room_url):
-    """Run bot process and capture output"""
-    try:
-        # Set up environment with debug logging
-        env = os.environ.copy()
-        env['LOGURU_LEVEL'] = 'DEBUG'
-        env['PYTHONUNBUFFERED'] = '1'  # Force unbuffered output
-
-        # Prepare command
-        cmd = [
-            sys.executable,  # Use same Python interpreter
-            "-u",  # Unbuffered output
-            "-m", "bot",
-            "-u", room_url,
-        ]
-
-        logger.info(f"Starting bot with command: {' '.join(cmd)}")
-
-        # Start process with pipe for output
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,  # Return strings instead of bytes
-            bufsize=1,  # Line buffered
-            cwd=os.path.dirname(os.path.abspath(__file__)),
-            env=env
-        )
+def popen_bot(module, args, stdin):
+    """Start a bot module in a sub-process. Blocks, so it runs on the bot
+    spawn threads"""
+    # Set up environment with debug logging
+    env = os.environ.copy()
+    env['LOGURU_LEVEL'] = 'DEBUG'
+    env['PYTHONUNBUFFERED'] = '1'  # Force unbuffered output
 
-        # Start threads to monitor output
-        stdout_thread = threading.Thread(
-            target=log_stream, 
-            args=(process.stdout, "BOT-OUT"),
-            daemon=True
-        )
-        stderr_thread = threading.Thread(
-            target=log_stream, 
-            args=(process.stderr, "BOT-ERR"),
-            daemon=True
+    # Prepare command
+    cmd = [
+        sys.executable,  # Use same Python interpreter
+        "-u",  # Unbuffered output
+        "-m", module,
+        *args,
+    ]
+
+    logger.info(f"Starting bot with command: {' '.join(cmd)}")
+
+    # Start process with pipe for output
+    return subprocess.Popen(
+        cmd,
+        stdin=stdin,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,  # Return strings instead of bytes
+        bufsize=1,  # Line buffered
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env
+    )
+
+async def start_bot_process(module, *args, stdin=None, capture_stdout=True):
+    """Start a bot module in a sub-process without blocking the event loop,
+    and capture its output"""
+    process = await asyncio.get_running_loop().run_in_executor(
+        bot_spawn_executor, popen_bot, module, args, stdin
+    )
+    capture_output(process, stdout=capture_stdout)
+    return process
+
+def capture_output(process, stdout=True):
+    """Log a bot's stderr, and stdout unless the caller reads it"""
+    if stdout:
+        bot_logs.add(process.stdout, f"BOT-OUT {process.pid}")
+    bot_logs.add(process.stderr, f"BOT-ERR {process.pid}")
+
+async def start_bot_worker():
+    """Start an idle bot worker, which reads its conversation from stdin"""
+    return await start_bot_process("bot_worker", stdin=subprocess.PIPE)
+
+async def start_bot_zygote(socket_path):
+    """Start the bot zygote. It exits when its stdin is closed"""
+    return await start_bot_process("bot_zygote", socket_path, stdin=subprocess.PIPE)
+
+async def restart_exited_bot_zygote():
+    """Restart the zygote if it died, e.g. killed or crashed"""
+    global bot_zygote_process
+    async with bot_zygote_lock:
+        returncode = bot_zygote_process.poll()
+        if returncode is None:
+            return
+        logger.warning(
+            f"Bot zygote {bot_zygote_process.pid} exited ({returncode}), restarting it"
         )
+        # A zygote that didn't shut down cleanly leaves its socket behind,
+        # which would look ready. Bots start from scratch until the new one is.
+        try:
+            os.unlink(bot_zygote.socket_path)
+        except FileNotFoundError:
+            pass
+        bot_zygote_process = await start_bot_zygote(bot_zygote.socket_path)
 
-        stdout_thread.start()
-        stderr_thread.start()
+async def start_bot_runner():
+    """Start a runner for in-process bots. Its stdout carries session events"""
+    return await start_bot_process(
+        "bot_runner",
+        "--max-sessions", str(BOT_RUNNER_MAX_SESSIONS),
+        stdin=subprocess.PIPE,
+        capture_stdout=False,
+    )
 
-        return process
+async def launch_bot(room_url, conversation_id):
+    """Start a bot for the conversation: as a session in a runner, forked by
+    the zygote or on an idle worker, depending on BOT_SPAWN_MODE. Returns
+    the bot and how it was started"""
+    if bot_runner_pool:
+        session = await bot_runner_pool.start_session(room_url, conversation_id)
+        if session:
+            logger.info(f"Started bot session {session.pid}")
+            return session, "inprocess"
+        logger.warning("All bot runners are full, starting a bot process")
+    if bot_zygote:
+        await restart_exited_bot_zygote()
+    if bot_zygote and bot_zygote.ready:
+        try:
+            process = await asyncio.get_running_loop().run_in_executor(
+                bot_spawn_executor,
+                bot_zygote.spawn,
+                {"room_url": room_url, "conversation_id": conversation_id},
+            )
+            logger.info(f"Bot zygote forked bot {process.pid}")
+            capture_output(process)
+            return process, "zygote"
+        except OSError as e:
+            logger.warning(f"Bot zygote unavailable ({e}), starting bot from scratch")
+    if bot_worker_pool:
+        return await bot_worker_pool.acquire(room_url, conversation_id), "worker"
+    return await start_bot_process("bot", "-u", room_url, "-c", conversation_id), "process"
 
+async def run_bot_process(room_url, conversation_id):
+    """Run a bot for the conversation and record how long it took to start"""
+    start_time = time.perf_counter()
+    try:
+        proc, spawn_mode = await launch_bot(room_url, conversation_id)
     except Exception as e:
         logger.error(f"Error starting bot process: {e}")
         raise
+    bot_spawn_latency[spawn_mode].observe(time.perf_counter() - start_time)
+    return proc
 
 @app.get("/")
 async def start_agent(request: Request):
     logger.info("Starting agent initialization")
     
+    conversation = None
+    bot_started = False
     try:
-        room_url, persona_name = await get_tavus_room()
+        conversation = await get_tavus_room()
+        room_url = conversation.room_url
         
         if not room_url:
             raise HTTPException(
@@ -147,22 +451,29 @@ async def start_agent(request: Request):
 
         # Check for existing bots
         num_bots_in_room = sum(
-            1 for proc in bot_procs.values() if proc[1] == room_url and proc[0].poll() is None
+            1 for entry in bot_procs.values() if entry.room_url == room_url and entry.proc.poll() is None
         )
         if num_bots_in_room >= MAX_BOTS_PER_ROOM:
             raise HTTPException(status_code=500, detail=f"Max bot limit reached for room: {room_url}")
 
         # Start bot process
-        proc = await run_bot_process(room_url)
+        proc = await run_bot_process(room_url, conversation.conversation_id)
         
         # Store process info
-        bot_procs[proc.pid] = (proc, room_url)
+        bot_procs[proc.pid] = BotProcess(
+            proc, room_url, conversation.conversation_id, time.monotonic()
+        )
+        bot_started = True
         logger.info(f"Bot process started with PID {proc.pid}")
 
         return RedirectResponse(room_url)
 
     except Exception as e:
         logger.error(f"Failed to initialize agent: {e}")
+        # No bot will join the conversation, and the reaper only knows about
+        # conversations that have one
+        if conversation and not bot_started:
+            end_conversation_in_background(conversation.conversation_id)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/status/{pid}")
@@ -171,12 +482,12 @@ def get_status(pid: int):
     if not proc:
         raise HTTPException(status_code=404, detail=f"Bot with process id: {pid} not found")
 
-    process, room_url = proc
-    returncode = process.poll()
+    returncode = proc.proc.poll()
 
     status_info = {
         "bot_id": pid,
-        "room_url": room_url,
+        "room_url": proc.room_url,
+        "conversation_id": proc.conversation_id,
     }
 
     if returncode is None:
@@ -186,6 +497,21 @@ def get_status(pid: int):
 
     return JSONResponse(status_info)
 
+@app.get("/metrics")
+async def get_metrics():
+    """Tavus API queue wait times, pool status and bot spawn latency"""
+    return {
+        "tavus_api": tavus_client.scheduler.stats,
+        "circuit_breaker": tavus_client.circuit_breaker.state,
+        "conversation_pool": {"ready": conversation_pool.ready},
+        "bot_worker_pool": {"idle": bot_worker_pool.idle if bot_worker_pool else 0},
+        "bot_runners": {"sessions": bot_runner_pool.sessions if bot_runner_pool else 0},
+        "bot_log_streams": bot_logs.streams,
+        "bot_spawn_latency": {
+            mode: histogram.stats for mode, histogram in bot_spawn_latency.items()
+        },
+    }
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -0,0 +1,466 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Micro-benchmarks for the Tavus audio path and bot start-up.
+
+Usage: python benchmark.py <benchmark> [options]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from loguru import logger
+
+from pipecat.clocks.system_clock import SystemClock
+from pipecat.frames.frames import (
+    EndFrame,
+    StartFrame,
+    TransportMessageUrgentFrame,
+    TTSAudioRawFrame,
+    TTSStartedFrame,
+    TTSStoppedFrame,
+)
+from pipecat.processors.frame_processor import FrameDirection
+
+from bot_zygote import BotZygote
+from tavus import Base64EchoEncoder, BinaryEchoEncoder, TavusVideoService
+
+ECHO_ENCODERS = {
+    "base64-json": Base64EchoEncoder,
+    "binary": BinaryEchoEncoder,
+}
+
+
+def make_audio(seconds: float, sample_rate: int = 16000) -> bytes:
+    """Random 16-bit mono PCM, so encoders can't take shortcuts"""
+    return os.urandom(int(seconds * sample_rate) * 2)
+
+
+def make_service(**params) -> TavusVideoService:
+    return TavusVideoService(
+        api_key="",
+        replica_id="",
+        session=None,
+        params=TavusVideoService.InputParams(**params),
+    )
+
+
+async def measure_loop_lag(work, interval: float = 0.001) -> list:
+    """Runs `work` while a ticker records how late each of its wakeups is"""
+    lags = []
+    running = True
+
+    async def ticker():
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - start - interval)
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(interval)
+    await work()
+    running = False
+    await ticker_task
+    return lags
+
+
+def report(name: str, lags: list, elapsed: float) -> None:
+    lags_ms = sorted(lag * 1000 for lag in lags)
+    p99 = lags_ms[int(len(lags_ms) * 0.99) - 1] if lags_ms else 0.0
+    print(
+        f"{name:<24} elapsed {elapsed * 1000:8.1f} ms | loop lag "
+        f"mean {statistics.fmean(lags_ms) if lags_ms else 0.0:6.2f} ms "
+        f"p99 {p99:6.2f} ms max {max(lags_ms, default=0.0):6.2f} ms"
+    )
+
+
+async def bench_encode(args) -> None:
+    """Event loop lag while encoding large chunks, inline vs. thread pool"""
+    audio = make_audio(args.chunk_seconds)
+    for name, threads in (("inline", 0), (f"executor ({args.threads} threads)", args.threads)):
+        tavus = make_service(encoder_threads=threads, encoder_offload_bytes=args.offload_bytes)
+
+        async def work():
+            for _ in range(args.chunks):
+                await tavus._encode_audio(audio)
+
+        start = time.perf_counter()
+        lags = await measure_loop_lag(work)
+        report(name, lags, time.perf_counter() - start)
+
+
+def message_size(message) -> int:
+    if isinstance(message, (bytes, bytearray)):
+        return len(message)
+    return len(json.dumps(message).encode("utf-8"))
+
+
+async def bench_echo(args) -> None:
+    """Throughput of the echo encoders. Their conformance tests are in
+    tests/test_echo_encoders.py"""
+    audio = make_audio(args.chunk_seconds)
+    for name, encoder_class in ECHO_ENCODERS.items():
+        encoder = encoder_class()
+
+        start = time.perf_counter()
+        wire_bytes = 0
+        for i in range(args.chunks):
+            message = encoder.build_message("c123", "1", encoder.encode(audio), False)
+            wire_bytes += message_size(message)
+        elapsed = time.perf_counter() - start
+
+        audio_seconds = args.chunks * args.chunk_seconds
+        print(
+            f"{name:<12} {args.chunks / elapsed:10.0f} msgs/s | "
+            f"{audio_seconds / elapsed:8.0f}x real time | "
+            f"{wire_bytes / audio_seconds / 1000:6.1f} kB per audio second "
+            f"({wire_bytes / (len(audio) * args.chunks):.2f}x PCM)"
+        )
+
+
+def traced_bytes(build, payload, count: int) -> int:
+    """Bytes still allocated after building `count` messages, keeping them all
+    alive so every allocation is counted"""
+    messages = []
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(count):
+        messages.append(build(payload, False))
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # The list itself isn't part of the message cost.
+    return after - before - (len(messages) * 8)
+
+
+async def bench_alloc(args) -> None:
+    """Envelope bytes allocated per second of audio, building every message
+    from scratch vs. with the per-inference message builder"""
+    chunk_seconds = args.chunk_seconds
+    for name, encoder_class in ECHO_ENCODERS.items():
+        encoder = encoder_class()
+        # Encoding is done once up front so only message building is measured.
+        payload = encoder.encode(make_audio(chunk_seconds))
+        audio_seconds = args.chunks * chunk_seconds
+
+        def per_chunk(payload, done):
+            return encoder.build_message("c123", "1234", payload, done)
+
+        builder = encoder.message_builder("c123", "1234")
+        for label, build in (("per chunk", per_chunk), ("builder", builder)):
+            allocated = traced_bytes(build, payload, args.chunks)
+            start = time.perf_counter()
+            for _ in range(args.chunks):
+                build(payload, False)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{name:<12} {label:<10} {allocated / audio_seconds:10.0f} B/audio-s | "
+                f"{elapsed / args.chunks * 1e9:8.0f} ns/msg"
+            )
+
+
+class CaptureSink:
+    """Stands in for the transport after TavusVideoService. Records when echo
+    messages arrive and, for every TTS chunk, how long it took until an echo
+    message carrying it was pushed"""
+
+    def __init__(self) -> None:
+        self.messages = 0
+        self.done_messages = 0
+        self.latencies = []
+        self._pending = []
+
+    def chunk_sent(self) -> None:
+        self._pending.append(time.perf_counter())
+
+    async def push_frame(self, frame, direction=FrameDirection.DOWNSTREAM) -> None:
+        if not isinstance(frame, TransportMessageUrgentFrame):
+            return
+        now = time.perf_counter()
+        self.messages += 1
+        self.latencies.extend(now - sent for sent in self._pending)
+        self._pending.clear()
+        if frame.message["properties"]["done"]:
+            self.done_messages += 1
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+async def run_utterances(
+    tavus: TavusVideoService, sink: CaptureSink, chunks: list, utterances: int, traced: bool
+) -> list:
+    """Feeds `utterances` TTS sequences through the service. When `traced`,
+    returns the peak bytes allocated while processing each chunk"""
+    allocations = []
+    done_expected = sink.done_messages + utterances
+    for _ in range(utterances):
+        await tavus.process_frame(TTSStartedFrame(), FrameDirection.DOWNSTREAM)
+        for frame in chunks:
+            if traced:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+            sink.chunk_sent()
+            await tavus.process_frame(frame, FrameDirection.DOWNSTREAM)
+            # Like a TTS websocket would, let the sender task run.
+            await asyncio.sleep(0)
+            if traced:
+                allocations.append(tracemalloc.get_traced_memory()[1] - before)
+        await tavus.process_frame(TTSStoppedFrame(), FrameDirection.DOWNSTREAM)
+    while sink.done_messages < done_expected:
+        await asyncio.sleep(0.001)
+    return allocations
+
+
+async def bench_throughput(args) -> None:
+    """Synthetic TTS sequences at common sample rates through
+    TavusVideoService.process_frame, with a capturing sink"""
+    results = {
+        "benchmark": "throughput",
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "utterances": args.utterances,
+        "utterance_seconds": args.utterance_seconds,
+        "chunk_ms": args.chunk_ms,
+        "rates": {},
+    }
+    for sample_rate in (16000, 22050, 24000, 44100):
+        tavus = make_service()
+        sink = CaptureSink()
+        tavus.push_frame = sink.push_frame
+
+        async def end_conversation():
+            pass
+
+        tavus.end_conversation = end_conversation
+        tavus.use_conversation("c123", "https://tavus.daily.co/c123")
+        await tavus.process_frame(StartFrame(clock=SystemClock()), FrameDirection.DOWNSTREAM)
+
+        chunk_samples = sample_rate * args.chunk_ms // 1000
+        chunk_count = int(args.utterance_seconds * 1000 / args.chunk_ms)
+        chunks = [
+            TTSAudioRawFrame(
+                audio=make_audio(chunk_samples / sample_rate, sample_rate),
+                sample_rate=sample_rate,
+                num_channels=1,
+            )
+            for _ in range(chunk_count)
+        ]
+
+        # Warm up resamplers and caches.
+        await run_utterances(tavus, sink, chunks, 1, traced=False)
+        sink.latencies.clear()
+        messages_before = sink.messages
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        await run_utterances(tavus, sink, chunks, args.utterances, traced=False)
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+
+        tracemalloc.start()
+        allocations = await run_utterances(tavus, sink, chunks, 1, traced=True)
+        tracemalloc.stop()
+
+        await tavus.process_frame(EndFrame(), FrameDirection.DOWNSTREAM)
+        await tavus.cleanup()
+
+        frames = args.utterances * (chunk_count + 2)
+        audio_seconds = args.utterances * chunk_count * args.chunk_ms / 1000
+        latencies_ms = [latency * 1000 for latency in sink.latencies]
+        result = {
+            "frames_per_second": frames / wall,
+            "audio_seconds_per_second": audio_seconds / wall,
+            "cpu_seconds_per_audio_second": cpu / audio_seconds,
+            "echo_messages": sink.messages - messages_before,
+            "alloc_peak_bytes_per_chunk": statistics.fmean(allocations),
+            "latency_ms": {
+                "p50": percentile(latencies_ms, 50),
+                "p90": percentile(latencies_ms, 90),
+                "p99": percentile(latencies_ms, 99),
+                "max": max(latencies_ms, default=0.0),
+            },
+        }
+        results["rates"][str(sample_rate)] = result
+        print(
+            f"{sample_rate:>6} Hz {result['frames_per_second']:9.0f} frames/s | "
+            f"{result['cpu_seconds_per_audio_second'] * 1000:7.3f} ms CPU/audio-s | "
+            f"{result['alloc_peak_bytes_per_chunk']:8.0f} B/chunk | latency "
+            f"p50 {result['latency_ms']['p50']:.3f} p99 {result['latency_ms']['p99']:.3f} ms"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+# Handed to the bots `spawn` starts, which never join a conversation
+PROBE_ASSIGNMENT = {"room_url": "probe", "conversation_id": "probe"}
+
+
+def probe(assignment: dict, vad_analyzer) -> None:
+    """Runs in place of the bot, since `spawn` only times start-up and
+    measures memory: reports ready and waits to be terminated"""
+    print("ready", flush=True)
+    signal.pause()
+
+
+def run_probe(module: str) -> None:
+    """Entry point of `benchmark.py probe <module>`: bot_worker or
+    bot_zygote, running `probe` instead of a bot"""
+    if module == "bot_worker":
+        import bot_worker
+
+        bot_worker.main(run=probe)
+    else:
+        import bot_zygote
+
+        bot_zygote.main(run=probe)
+
+
+def start_bot(module: str, *args, stderr=subprocess.DEVNULL) -> subprocess.Popen:
+    """Starts `module` through `benchmark.py probe`"""
+    return subprocess.Popen(
+        [sys.executable, "-u", os.path.abspath(__file__), "probe", module, *args],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=stderr,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+
+
+def assign(worker: subprocess.Popen, assignment: dict) -> None:
+    worker.stdin.write(json.dumps(assignment) + "\n")
+    worker.stdin.close()
+
+
+def wait_for_line(stream, text: str) -> None:
+    for line in stream:
+        if text in line:
+            return
+    raise RuntimeError(f"Bot exited before printing {text!r}")
+
+
+def memory_kb(pid: int) -> dict:
+    """Resident, proportional and unique memory of a process, in kB"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if value.strip().endswith("kB"):
+                fields[name] = int(value.split()[0])
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+async def bench_spawn(args) -> None:
+    """Time from asking for a bot to the bot being ready to join, and the
+    memory of each bot while `--bots` of them run, per spawn mode"""
+    for mode in ("process", "worker", "zygote"):
+        template = None
+        if mode == "zygote":
+            socket_path = os.path.join(tempfile.mkdtemp(prefix="bot-zygote-"), "zygote.sock")
+            template = start_bot("bot_zygote", socket_path)
+            zygote = BotZygote(socket_path=socket_path)
+            while not zygote.ready:
+                time.sleep(0.01)
+
+        bots = []
+        latencies = []
+        for _ in range(args.bots):
+            if mode == "worker":
+                # Idle and warm, like the workers BotWorkerPool keeps
+                worker = start_bot("bot_worker", stderr=subprocess.PIPE)
+                wait_for_line(worker.stderr, "Bot worker ready")
+
+            start_time = time.perf_counter()
+            if mode == "process":
+                bot = start_bot("bot_worker")
+                assign(bot, PROBE_ASSIGNMENT)
+            elif mode == "worker":
+                bot = worker
+                assign(bot, PROBE_ASSIGNMENT)
+            else:
+                bot = zygote.spawn(PROBE_ASSIGNMENT)
+            wait_for_line(bot.stdout, "ready")
+            latencies.append((time.perf_counter() - start_time) * 1000)
+            bots.append(bot)
+
+        memory = [memory_kb(bot.pid) for bot in bots]
+        for bot in bots:
+            bot.terminate()
+            bot.wait()
+
+        line = (
+            f"{mode:>8} | spawn p50 {percentile(latencies, 50):8.1f} ms "
+            f"max {max(latencies):8.1f} ms | per bot MB: "
+            f"RSS {statistics.fmean(m['rss'] for m in memory) / 1024:6.1f} "
+            f"PSS {statistics.fmean(m['pss'] for m in memory) / 1024:6.1f} "
+            f"USS {statistics.fmean(m['uss'] for m in memory) / 1024:6.1f}"
+        )
+        if template:
+            line += f" | template PSS {memory_kb(template.pid)['pss'] / 1024:.1f} MB"
+            template.stdin.close()
+            template.wait()
+        print(line)
+
+
+BENCHMARKS = {
+    "encode": bench_encode,
+    "echo": bench_echo,
+    "alloc": bench_alloc,
+    "throughput": bench_throughput,
+    "spawn": bench_spawn,
+}
+
+
+def main():
+    if sys.argv[1:2] == ["probe"]:
+        # bot_zygote reads its socket path from sys.argv[1]
+        module = sys.argv[2]
+        sys.argv[1:] = sys.argv[3:]
+        run_probe(module)
+        return
+
+    parser = argparse.ArgumentParser(description="Tavus audio path benchmarks")
+    parser.add_argument("benchmark", choices=BENCHMARKS.keys())
+    parser.add_argument("--chunks", type=int, default=200, help="Chunks per run")
+    parser.add_argument("--chunk-seconds", type=float, default=2.0, help="Audio per chunk")
+    parser.add_argument("--threads", type=int, default=2, help="Encoder threads")
+    parser.add_argument("--offload-bytes", type=int, default=32000)
+    parser.add_argument("--utterances", type=int, default=20, help="TTS sequences per rate")
+    parser.add_argument("--utterance-seconds", type=float, default=5.0)
+    parser.add_argument("--chunk-ms", type=int, default=20, help="TTS chunk duration")
+    parser.add_argument("--bots", type=int, default=5, help="Bots running at once")
+    parser.add_argument("--output", default="benchmark_results.json", help="Results file")
+    parser.add_argument("--log-level", default="WARNING", help="Log level of the services")
+    args = parser.parse_args()
+
+    # The services log every inference at DEBUG, which would bury the results
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+    asyncio.run(BENCHMARKS[args.benchmark](args))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@
 # SPDX-License-Identifier: BSD 2-Clause License
 #
 
+import argparse
 import asyncio
 import aiohttp
 import os
@@ -36,7 +37,12 @@ logger.remove(0)
 logger.add(sys.stderr, level="DEBUG")
 
 
-async def main():
+async def main(
+    room_url: str = None,
+    conversation_id: str = None,
+    vad_analyzer: SileroVADAnalyzer = None,
+    handle_sigint: bool = True,
+):
     async with aiohttp.ClientSession() as session:
         tavus = TavusVideoService(
             api_key=os.getenv("TAVUS_API_KEY"),
@@ -46,8 +52,12 @@ async def main():
         )
 
         # get persona, look up persona_name, set this as the bot name to ignore
-        persona_name = await tavus.get_persona_name()
-        room_url = await tavus.initialize()
+        if room_url and conversation_id:
+            # Join the conversation created by the app server
+            tavus.use_conversation(conversation_id, room_url)
+            persona_name = await tavus.get_persona_name()
+        else:
+            room_url, persona_name = await tavus.start_conversation()
 
         transport = DailyTransport(
             room_url=room_url,
@@ -55,7 +65,8 @@ async def main():
             bot_name="Pipecat bot",
             params=DailyParams(
                 vad_enabled=True,
-                vad_analyzer=SileroVADAnalyzer(),
+                # Bot workers load the VAD model before they get a conversation
+                vad_analyzer=vad_analyzer or SileroVADAnalyzer(),
                 vad_audio_passthrough=True,
             ),
         )
@@ -65,6 +76,8 @@ async def main():
         tts = CartesiaTTSService(
             api_key=os.getenv("CARTESIA_API_KEY"),
             voice_id="a167e0f3-df7e-4d52-a9c3-f949145efdab",
+            # Generate audio at the rate Tavus expects so it is not resampled
+            sample_rate=tavus.sample_rate,
         )
 
         llm = OpenAILLMService(model="gpt-4o-mini")
@@ -124,10 +137,14 @@ async def main():
                 )
                 await task.queue_frames([LLMMessagesFrame(messages)])
 
-        runner = PipelineRunner()
+        runner = PipelineRunner(handle_sigint=handle_sigint)
 
         await runner.run(task)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Pipecat Tavus bot")
+    parser.add_argument("-u", "--url", type=str, help="Tavus conversation URL")
+    parser.add_argument("-c", "--conversation-id", type=str, help="Tavus conversation ID")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.conversation_id))
@@ -278,8 +278,7 @@ async def main():
         )
 
         # Get persona name and room URL
-        persona_name = await tavus.get_persona_name()
-        room_url = await tavus.initialize()
+        room_url, persona_name = await tavus.start_conversation()
         #room_url = await configure(session)
         logger.info(f"Join the video call at: {room_url}")
 
@@ -303,6 +302,8 @@ async def main():
         tts = CartesiaTTSService(
             api_key=os.getenv("CARTESIA_API_KEY"),
             voice_id="829ccd10-f8b3-43cd-b8a0-4aeaa81f3b30",  # British Lady
+            # Generate audio at the rate Tavus expects so it is not resampled
+            sample_rate=tavus.sample_rate,
         )
 
         messages = []
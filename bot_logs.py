@@ -0,0 +1,95 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Log capture for bot processes"""
+
+import asyncio
+
+from typing import List, Optional, Set
+
+from loguru import logger
+
+
+class BotLogMultiplexer:
+    """Reads the output pipes of every bot on the event loop, instead of a
+    thread per pipe, and writes their lines to loguru tagged with the bot.
+
+    Lines are written in batches, one log record per batch, every
+    `interval` seconds or once `max_batch` lines are waiting.
+    """
+
+    def __init__(
+        self, *, interval: float = 0.1, max_batch: int = 500, line_limit: int = 2**20
+    ) -> None:
+        self._interval = interval
+        self._max_batch = max_batch
+        self._line_limit = line_limit
+        self._lines: List[str] = []
+        self._readers: Set[asyncio.Task] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @property
+    def streams(self) -> int:
+        return len(self._readers)
+
+    def start(self) -> None:
+        self._flush_task = asyncio.create_task(self._flush_task_handler())
+
+    async def stop(self) -> None:
+        for reader in list(self._readers):
+            reader.cancel()
+        await asyncio.gather(*self._readers, return_exceptions=True)
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        self._flush()
+
+    def add(self, stream, tag: str) -> None:
+        """Logs the lines read from `stream`, a pipe, prefixed with `tag`
+        until it is closed. Must be called from the event loop"""
+        task = asyncio.get_running_loop().create_task(self._read(stream, tag))
+        self._readers.add(task)
+        task.add_done_callback(self._readers.discard)
+
+    async def _read(self, stream, tag: str) -> None:
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=self._line_limit)
+        transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), stream
+        )
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    self._append(f"{tag}: <line longer than {self._line_limit} bytes dropped>")
+                    continue
+                if not line:
+                    break
+                line = line.decode("utf-8", errors="replace").strip()
+                if line:
+                    self._append(f"{tag}: {line}")
+        finally:
+            transport.close()
+
+    def _append(self, line: str) -> None:
+        self._lines.append(line)
+        if len(self._lines) >= self._max_batch:
+            self._flush()
+
+    async def _flush_task_handler(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._lines:
+            lines, self._lines = self._lines, []
+            logger.info("\n".join(lines))
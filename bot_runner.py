@@ -0,0 +1,293 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Runs many bot sessions as asyncio tasks in one worker process.
+
+    python -u -m bot_runner --max-sessions 10
+
+The runner reads commands from stdin, one JSON object per line:
+
+    {"command": "start", "session_id": 4194304, "room_url": "...", "conversation_id": "..."}
+    {"command": "stop", "session_id": 4194304}
+
+and writes an `{"event": "exited", "session_id": ..., "code": ...}` line to
+stdout when a session ends. Everything else the sessions print goes to
+stderr, with log lines tagged with their session id. A session that fails
+is logged and reported as exited without affecting the others. The runner
+stops its sessions and exits when stdin is closed.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+# Session ids start above the largest Linux pid, so sessions and bot
+# processes can share app.py's bot_procs and /status endpoint
+_session_ids = itertools.count(2**22)
+
+
+class RunnerSession:
+    """A bot session in a runner, with the parts of the `subprocess.Popen`
+    interface app.py uses"""
+
+    def __init__(self, runner: "BotRunner", session_id: int) -> None:
+        self.pid = session_id
+        self.returncode: Optional[int] = None
+        self._runner = runner
+        self._exited = threading.Event()
+
+    def poll(self) -> Optional[int]:
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        if not self._exited.wait(timeout):
+            raise subprocess.TimeoutExpired(f"bot session {self.pid}", timeout)
+        return self.returncode
+
+    def terminate(self) -> None:
+        if self.returncode is None:
+            self._runner.stop_session(self.pid)
+
+    def kill(self) -> None:
+        # A session can't be killed on its own: this kills the runner, and
+        # every session in it
+        if self.returncode is None:
+            self._runner.process.kill()
+
+    def set_returncode(self, code: int) -> None:
+        self.returncode = code
+        self._exited.set()
+
+
+class BotRunner:
+    """A runner process and the sessions running in it"""
+
+    def __init__(self, process: subprocess.Popen) -> None:
+        self.process = process
+        self.sessions: Dict[int, RunnerSession] = {}
+        self._events_thread = threading.Thread(target=self._read_events, daemon=True)
+        self._events_thread.start()
+
+    @property
+    def active(self) -> int:
+        # Sessions are removed when the runner reports that they exited
+        return len(self.sessions)
+
+    def start_session(self, room_url: str, conversation_id: str) -> RunnerSession:
+        session = RunnerSession(self, next(_session_ids))
+        self.sessions[session.pid] = session
+        self._send(
+            {
+                "command": "start",
+                "session_id": session.pid,
+                "room_url": room_url,
+                "conversation_id": conversation_id,
+            }
+        )
+        return session
+
+    def stop_session(self, session_id: int) -> None:
+        try:
+            self._send({"command": "stop", "session_id": session_id})
+        except OSError:
+            # The runner is gone, and its sessions with it
+            pass
+
+    def stop(self, timeout: float = 10) -> None:
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def _send(self, command: dict) -> None:
+        self.process.stdin.write(json.dumps(command) + "\n")
+        self.process.stdin.flush()
+
+    def _read_events(self) -> None:
+        for line in iter(self.process.stdout.readline, ""):
+            try:
+                event = json.loads(line)
+                session = self.sessions.pop(event["session_id"])
+                session.set_returncode(event["code"])
+            except (ValueError, KeyError) as e:
+                logger.error(f"Invalid event from bot runner {self.process.pid}: {line!r} ({e})")
+
+        # The runner exited: so did every session still in it
+        returncode = self.process.wait()
+        for session in list(self.sessions.values()):
+            session.set_returncode(returncode or -1)
+        self.sessions.clear()
+
+
+class BotRunnerPool:
+    """`size` runner processes, each running up to `max_sessions` bot
+    sessions. `spawn` starts a runner process with stdin and stdout pipes"""
+
+    def __init__(
+        self, *, spawn: Callable[[], Awaitable[subprocess.Popen]], size: int, max_sessions: int
+    ) -> None:
+        self._spawn = spawn
+        self._size = size
+        self._max_sessions = max_sessions
+        self._runners: List[BotRunner] = []
+        # So concurrent requests don't both restart the same runner
+        self._lock = asyncio.Lock()
+
+    @property
+    def sessions(self) -> int:
+        return sum(runner.active for runner in self._runners)
+
+    async def start(self) -> None:
+        processes = await asyncio.gather(*(self._spawn() for _ in range(self._size)))
+        self._runners = [BotRunner(process) for process in processes]
+
+    async def stop(self) -> None:
+        runners, self._runners = self._runners, []
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(None, runner.stop) for runner in runners))
+
+    async def start_session(
+        self, room_url: str, conversation_id: str
+    ) -> Optional[RunnerSession]:
+        """Starts a session on the least busy runner. Returns None when every
+        runner is full"""
+        async with self._lock:
+            for i, runner in enumerate(self._runners):
+                if runner.process.poll() is not None:
+                    logger.warning(
+                        f"Bot runner {runner.process.pid} exited ({runner.process.returncode}), "
+                        "restarting it"
+                    )
+                    self._runners[i] = BotRunner(await self._spawn())
+
+            runner = min(self._runners, key=lambda runner: runner.active, default=None)
+            if not runner or runner.active >= self._max_sessions:
+                return None
+            return runner.start_session(room_url, conversation_id)
+
+
+class SessionRunner:
+    """Runs `run(room_url, conversation_id)` as a task per session"""
+
+    def __init__(
+        self, *, run: Callable[[str, str], Awaitable[None]], max_sessions: int, events
+    ) -> None:
+        self._run = run
+        self._max_sessions = max_sessions
+        self._events = events
+        self._sessions: Dict[int, asyncio.Task] = {}
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        loop.set_exception_handler(self._exception_handler)
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                self._handle_command(json.loads(line))
+            except (ValueError, KeyError) as e:
+                logger.error(f"Invalid bot runner command {line!r}: {e}")
+
+        logger.info(f"Bot runner stdin closed, stopping {len(self._sessions)} sessions")
+        for task in self._sessions.values():
+            task.cancel()
+        await asyncio.gather(*self._sessions.values(), return_exceptions=True)
+
+    def _handle_command(self, command: dict) -> None:
+        session_id = command["session_id"]
+        if command["command"] == "start":
+            if len(self._sessions) >= self._max_sessions:
+                logger.error(f"Bot runner full, rejecting session {session_id}")
+                self._emit_exited(session_id, 1)
+                return
+            self._sessions[session_id] = asyncio.create_task(
+                self._run_session(session_id, command["room_url"], command["conversation_id"])
+            )
+        elif command["command"] == "stop":
+            task = self._sessions.get(session_id)
+            if task:
+                task.cancel()
+
+    async def _run_session(self, session_id: int, room_url: str, conversation_id: str) -> None:
+        # Tasks the session creates inherit the context, and with it the tag
+        with logger.contextualize(session=session_id):
+            logger.info(f"Starting bot session for {room_url}")
+            code = 0
+            try:
+                await self._run(room_url, conversation_id)
+            except asyncio.CancelledError:
+                logger.info("Bot session stopped")
+                code = -15
+            except Exception:
+                logger.exception("Bot session failed")
+                code = 1
+            finally:
+                del self._sessions[session_id]
+                self._emit_exited(session_id, code)
+
+    def _emit_exited(self, session_id: int, code: int) -> None:
+        self._events.write(
+            json.dumps({"event": "exited", "session_id": session_id, "code": code}) + "\n"
+        )
+        self._events.flush()
+
+    def _exception_handler(self, loop, context) -> None:
+        # Errors in tasks nobody awaits are logged instead of taking
+        # anything else down
+        exception = context.get("exception")
+        logger.error(f"Unhandled error in bot runner: {context['message']} ({exception!r})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipecat Tavus bot session runner")
+    parser.add_argument("--max-sessions", type=int, default=10)
+    args = parser.parse_args()
+
+    # Imported here so app.py can use BotRunnerPool without importing
+    # pipecat. Imported before logging is set up, since bot.py sets up its own.
+    import bot
+
+    async def run(room_url: str, conversation_id: str) -> None:
+        # The runner owns the process' signals, not the sessions
+        await bot.main(room_url, conversation_id, handle_sigint=False)
+
+    # stdout carries events only: anything printed goes to stderr instead
+    events = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    logger.remove()
+    logger.configure(extra={"session": "-"})
+    logger.add(
+        sys.stderr,
+        level="DEBUG",
+        format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {level} | session {extra[session]} | "
+        "{name}:{function}:{line} - {message}",
+    )
+
+    runner = SessionRunner(run=run, max_sessions=args.max_sessions, events=events)
+    asyncio.run(runner.run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Bot worker process, started ahead of time by BotWorkerPool.
+
+The worker imports pipecat and the bot modules and loads the VAD model, then
+waits for its conversation: one JSON line on stdin with `room_url` and
+`conversation_id`.
+
+    python -u -m bot_worker
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+from typing import Any, Callable, Dict
+
+from loguru import logger
+
+start_time = time.perf_counter()
+
+import bot
+
+from pipecat.audio.vad.silero import SileroVADAnalyzer
+
+
+def load_models() -> SileroVADAnalyzer:
+    vad_analyzer = SileroVADAnalyzer()
+    logger.info(f"Bot worker ready in {time.perf_counter() - start_time:.2f}s")
+    return vad_analyzer
+
+
+def run_assignment(assignment: Dict[str, Any], vad_analyzer: SileroVADAnalyzer) -> None:
+    logger.info(f"Bot worker joining {assignment['room_url']}")
+    asyncio.run(
+        bot.main(assignment["room_url"], assignment["conversation_id"], vad_analyzer=vad_analyzer)
+    )
+
+
+def main(run: Callable[[Dict[str, Any], SileroVADAnalyzer], None] = run_assignment):
+    vad_analyzer = load_models()
+
+    line = sys.stdin.readline()
+    if not line:
+        # The supervisor shut down before handing this worker a conversation
+        return
+    run(json.loads(line), vad_analyzer)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Pool of bot worker processes started ahead of time"""
+
+import asyncio
+import json
+import subprocess
+
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from loguru import logger
+
+
+class BotWorkerPool:
+    """Keeps `size` idle bot workers (see bot_worker.py) that have already
+    imported pipecat and loaded the VAD model, so a bot can join its
+    conversation without paying for that.
+
+    `spawn` starts a worker process with a stdin pipe. `acquire()` hands an
+    idle worker its conversation over stdin and starts a replacement in the
+    background. When no worker is idle, one is started and handed the
+    conversation right away.
+    """
+
+    def __init__(
+        self, *, spawn: Callable[[], Awaitable[subprocess.Popen]], size: int
+    ) -> None:
+        self._spawn = spawn
+        self._size = size
+        self._idle: deque = deque()
+        self._fill_task: Optional[asyncio.Task] = None
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    async def start(self) -> None:
+        await self._fill()
+
+    async def stop(self) -> None:
+        if self._fill_task:
+            self._fill_task.cancel()
+            try:
+                await self._fill_task
+            except asyncio.CancelledError:
+                pass
+
+        workers = list(self._idle)
+        self._idle.clear()
+        for worker in workers:
+            # Closing stdin lets an idle worker exit on its own
+            worker.stdin.close()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(None, self._wait, worker) for worker in workers)
+        )
+
+    async def acquire(self, room_url: str, conversation_id: str) -> subprocess.Popen:
+        assignment = json.dumps({"room_url": room_url, "conversation_id": conversation_id})
+
+        worker = None
+        while self._idle and not worker:
+            idle = self._idle.popleft()
+            if self._assign(idle, assignment):
+                worker = idle
+            else:
+                logger.warning(f"Idle bot worker {idle.pid} exited ({idle.poll()}), discarding it")
+                idle.kill()
+
+        if not worker:
+            logger.debug("No idle bot worker, starting one on demand")
+            worker = await self._spawn()
+            if not self._assign(worker, assignment):
+                worker.kill()
+                raise RuntimeError(
+                    f"Bot worker {worker.pid} exited ({worker.poll()}) before it was "
+                    "handed its conversation"
+                )
+
+        if not self._fill_task:
+            self._fill_task = asyncio.create_task(self._fill())
+        return worker
+
+    def _assign(self, worker: subprocess.Popen, assignment: str) -> bool:
+        if worker.poll() is not None:
+            return False
+        try:
+            worker.stdin.write(assignment + "\n")
+            worker.stdin.close()
+            return True
+        except OSError:
+            return False
+
+    async def _fill(self) -> None:
+        try:
+            while len(self._idle) < self._size:
+                worker = await self._spawn()
+                self._idle.append(worker)
+                logger.debug(
+                    f"Started bot worker {worker.pid} ({len(self._idle)}/{self._size} idle)"
+                )
+        except Exception as e:
+            logger.error(f"Error starting bot worker: {e}")
+        finally:
+            self._fill_task = None
+
+    @staticmethod
+    def _wait(worker: subprocess.Popen) -> None:
+        try:
+            worker.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            worker.kill()
+            worker.wait()
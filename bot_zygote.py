@@ -0,0 +1,239 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Zygote for bot processes.
+
+The zygote is a template process that imports pipecat and the bot modules
+and loads the VAD model once, then forks a bot per conversation. Bots start
+without importing anything and share the template's pages copy-on-write
+instead of each keeping a private copy of the modules and model weights.
+
+    python -u -m bot_zygote /tmp/bot-zygote.sock
+
+For each bot, BotZygote connects to the zygote's Unix socket and sends the
+assignment JSON along with the bot's stdout and stderr pipes. The zygote
+replies with the bot's pid, then with its exit code once it exits. The
+zygote exits when its stdin is closed.
+"""
+
+import json
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+# How often the zygote reaps exited bots, in seconds
+REAP_INTERVAL = 0.5
+
+
+class ZygoteProcess:
+    """A bot forked by the zygote, with the parts of the `subprocess.Popen`
+    interface app.py uses"""
+
+    def __init__(self, pid: int, conn: socket.socket, stdout, stderr) -> None:
+        self.pid = pid
+        self.returncode: Optional[int] = None
+        self.stdout = stdout
+        self.stderr = stderr
+        self._conn = conn
+
+    def poll(self) -> Optional[int]:
+        if self.returncode is None:
+            self._conn.setblocking(False)
+            try:
+                self._set_returncode(self._conn.recv(64))
+            except BlockingIOError:
+                pass
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        if self.returncode is None:
+            self._conn.settimeout(timeout)
+            try:
+                self._set_returncode(self._conn.recv(64))
+            except socket.timeout:
+                raise subprocess.TimeoutExpired(f"bot {self.pid}", timeout)
+        return self.returncode
+
+    def send_signal(self, sig: int) -> None:
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self) -> None:
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        self.send_signal(signal.SIGKILL)
+
+    def _set_returncode(self, data: bytes) -> None:
+        # No data means the zygote itself went away, and with it the only
+        # process that could report the exit code.
+        self.returncode = int(data) if data.strip() else -1
+        self._conn.close()
+
+
+class BotZygote:
+    """Starts bots by asking the zygote listening on `socket_path` to fork
+    one"""
+
+    def __init__(self, *, socket_path: str) -> None:
+        self._socket_path = socket_path
+
+    @property
+    def socket_path(self) -> str:
+        return self._socket_path
+
+    @property
+    def ready(self) -> bool:
+        """The zygote binds its socket once it has loaded everything"""
+        return os.path.exists(self._socket_path)
+
+    def spawn(self, assignment: Dict[str, Any]) -> ZygoteProcess:
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.connect(self._socket_path)
+            socket.send_fds(conn, [json.dumps(assignment).encode()], [stdout_w, stderr_w])
+            pid = b""
+            while not pid.endswith(b"\n"):
+                data = conn.recv(1)
+                if not data:
+                    raise ConnectionError("Bot zygote closed the connection")
+                pid += data
+        except BaseException:
+            conn.close()
+            os.close(stdout_r)
+            os.close(stderr_r)
+            raise
+        finally:
+            os.close(stdout_w)
+            os.close(stderr_w)
+
+        return ZygoteProcess(
+            int(pid), conn, os.fdopen(stdout_r, "r"), os.fdopen(stderr_r, "r")
+        )
+
+
+def serve(socket_path: str, run) -> None:
+    """Forks a child that calls `run(assignment)` for every connection, until
+    stdin is closed"""
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Bind under a temporary name so BotZygote.ready only sees a listening
+    # socket
+    bind_path = f"{socket_path}.tmp"
+    if os.path.exists(bind_path):
+        os.unlink(bind_path)
+    server.bind(bind_path)
+    server.listen()
+    os.rename(bind_path, socket_path)
+    logger.info(f"Bot zygote listening on {socket_path}")
+
+    # pid -> connection the bot was requested on
+    children: Dict[int, socket.socket] = {}
+    try:
+        while True:
+            readable, _, _ = select.select([server, sys.stdin], [], [], REAP_INTERVAL)
+            if sys.stdin in readable and not sys.stdin.readline():
+                logger.info("Bot zygote stdin closed, exiting")
+                return
+            if server in readable:
+                conn, _ = server.accept()
+                try:
+                    pid = fork_bot(server, conn, children, run)
+                    children[pid] = conn
+                except Exception as e:
+                    logger.error(f"Error forking bot: {e}")
+                    conn.close()
+            reap(children)
+    finally:
+        server.close()
+        os.unlink(socket_path)
+
+
+def fork_bot(server: socket.socket, conn: socket.socket, children: Dict, run) -> int:
+    message, fds, _, _ = socket.recv_fds(conn, 4096, 2)
+    try:
+        assignment = json.loads(message)
+        # Anything still buffered would be written by both processes
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            run_child(server, conn, children, fds, run, assignment)
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+    conn.sendall(f"{pid}\n".encode())
+    return pid
+
+
+def run_child(server, conn, children, fds, run, assignment) -> None:
+    code = 0
+    try:
+        server.close()
+        conn.close()
+        for other in children.values():
+            other.close()
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(fds[0], 1)
+        os.dup2(fds[1], 2)
+        run(assignment)
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 1
+    except BaseException:
+        logger.exception("Bot forked by the zygote failed")
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # Skip the zygote's atexit handlers and finalizers
+        os._exit(code)
+
+
+def reap(children: Dict[int, socket.socket]) -> None:
+    while children:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            return
+        conn = children.pop(pid, None)
+        if conn:
+            try:
+                conn.sendall(f"{os.waitstatus_to_exitcode(status)}\n".encode())
+            except OSError:
+                pass
+            conn.close()
+
+
+def main(run=None):
+    """`run(assignment, vad_analyzer)` runs a forked bot, bot_worker's
+    run_assignment by default"""
+    # Imported here so app.py can use BotZygote without importing pipecat
+    from bot_worker import load_models, run_assignment
+
+    run = run or run_assignment
+
+    # Loaded before forking so every bot shares the model weights. The
+    # Silero ONNX session runs single-threaded, so there are no worker
+    # threads to lose across fork(). Daily is initialized later, in the
+    # child, when the transport is created.
+    vad_analyzer = load_models()
+    serve(sys.argv[1], lambda assignment: run(assignment, vad_analyzer))
+
+
+if __name__ == "__main__":
+    main()
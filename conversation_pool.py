@@ -0,0 +1,136 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Pool of Tavus conversations created ahead of time"""
+
+import asyncio
+import time
+
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional, Set
+
+from loguru import logger
+
+
+class ConversationPool:
+    """Keeps up to `size` conversations created in the background so requests
+    can be handed one without waiting for the Tavus API.
+
+    Conversations that stay unused for longer than `ttl` seconds are ended
+    with `end` and replaced. When the pool is empty, `acquire()` creates a
+    conversation on demand. `create` is told whether it runs in the
+    background (refills) or for a waiting request.
+    """
+
+    def __init__(
+        self,
+        *,
+        create: Callable[[bool], Awaitable[Any]],
+        end: Callable[[Any], Awaitable[None]],
+        size: int,
+        ttl: float,
+        refill_interval: float = 5.0,
+    ) -> None:
+        self._create = create
+        self._end = end
+        self._size = size
+        self._ttl = ttl
+        self._refill_interval = refill_interval
+
+        # (created_at, conversation), oldest first
+        self._ready: deque = deque()
+        self._creating = 0
+        self._refill_event = asyncio.Event()
+        self._refill_task: Optional[asyncio.Task] = None
+        self._end_tasks: Set[asyncio.Task] = set()
+
+    @property
+    def ready(self) -> int:
+        return len(self._ready)
+
+    async def start(self) -> None:
+        if self._size > 0:
+            self._refill_task = asyncio.create_task(self._refill_task_handler())
+
+    async def stop(self) -> None:
+        if self._refill_task:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+
+        conversations = [conversation for _, conversation in self._ready]
+        self._ready.clear()
+        await self._end_all(conversations)
+        if self._end_tasks:
+            await asyncio.gather(*self._end_tasks)
+
+    async def acquire(self) -> Any:
+        now = time.monotonic()
+        expired = []
+        conversation = None
+        while self._ready:
+            created_at, pooled = self._ready.popleft()
+            if now - created_at < self._ttl:
+                conversation = pooled
+                break
+            expired.append(pooled)
+
+        self._refill_event.set()
+        if expired:
+            task = asyncio.create_task(self._end_all(expired))
+            self._end_tasks.add(task)
+            task.add_done_callback(self._end_tasks.discard)
+
+        if conversation is None:
+            logger.debug("Conversation pool empty, creating a conversation on demand")
+            conversation = await self._create(False)
+        return conversation
+
+    async def _refill_task_handler(self) -> None:
+        while True:
+            await self._expire()
+
+            missing = self._size - len(self._ready) - self._creating
+            if missing > 0:
+                await asyncio.gather(*(self._create_pooled() for _ in range(missing)))
+
+            try:
+                await asyncio.wait_for(self._refill_event.wait(), timeout=self._refill_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._refill_event.clear()
+
+    async def _create_pooled(self) -> None:
+        self._creating += 1
+        try:
+            conversation = await self._create(True)
+            self._ready.append((time.monotonic(), conversation))
+            logger.debug(f"Conversation pool refilled ({len(self._ready)}/{self._size})")
+        except Exception as e:
+            logger.error(f"Error creating pooled conversation: {e}")
+        finally:
+            self._creating -= 1
+
+    async def _expire(self) -> None:
+        now = time.monotonic()
+        expired = []
+        while self._ready and now - self._ready[0][0] >= self._ttl:
+            expired.append(self._ready.popleft()[1])
+        if expired:
+            logger.debug(f"Conversation pool ending {len(expired)} expired conversations")
+            await self._end_all(expired)
+
+    async def _end_all(self, conversations: list) -> None:
+        results = await asyncio.gather(
+            *(self._end(conversation) for conversation in conversations),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error ending pooled conversation: {result}")
@@ -8,10 +8,24 @@
 """This module implements Tavus as a sink transport layer"""
 
 import aiohttp
+import asyncio
 import base64
+import json
+import numpy as np
+import os
+import soxr
+import struct
+import time
+
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple, Union
+from pydantic import BaseModel
 
 from pipecat.frames.frames import (
     Frame,
+    MetricsFrame,
+    StartFrame,
     TTSAudioRawFrame,
     TransportMessageUrgentFrame,
     TTSStartedFrame,
@@ -20,76 +34,854 @@ from pipecat.frames.frames import (
     EndFrame,
     CancelFrame,
 )
+from pipecat.metrics.metrics import MetricsData
 from pipecat.processors.frame_processor import FrameDirection
 from pipecat.services.ai_services import AIService
-from pipecat.audio.utils import resample_audio
+
+from tavus_api import TavusApiClient, background_requests
 
 from loguru import logger
 
 
+TAVUS_SAMPLE_RATE = 16000
+
+# Multiple of 3 so the base64 of consecutive slices can be concatenated.
+_BASE64_SLICE_BYTES = 3 * 8192
+
+
+def encode_audio(audio: bytes) -> str:
+    """Base64 encodes audio in slices. Used from the encoder threads, where
+    slicing gives the event loop thread a chance to take the GIL between
+    slices instead of waiting for the whole chunk"""
+    if len(audio) <= _BASE64_SLICE_BYTES:
+        return base64.b64encode(audio).decode("utf-8")
+    view = memoryview(audio)
+    return "".join(
+        base64.b64encode(view[i : i + _BASE64_SLICE_BYTES]).decode("utf-8")
+        for i in range(0, len(view), _BASE64_SLICE_BYTES)
+    )
+
+
+# Builds the echo message for one chunk of an inference from the encoded
+# payload and the done flag.
+EchoMessageBuilder = Callable[[Any, bool], Any]
+
+
+class EchoEncoder:
+    """Turns chunks of 16 kHz audio into conversation.echo transport messages.
+
+    `encode()` does the CPU heavy part and must be thread safe, since it may
+    run in the encoder thread pool. `build_message()` and the builders
+    returned by `message_builder()` run on the event loop.
+    """
+
+    def encode(self, audio: bytes) -> Any:
+        raise NotImplementedError
+
+    def build_message(
+        self, conversation_id: str, inference_id: str, payload: Any, done: bool
+    ) -> Any:
+        raise NotImplementedError
+
+    def message_builder(self, conversation_id: str, inference_id: str) -> EchoMessageBuilder:
+        """Returns a builder for the messages of one inference. Encoders can
+        override this to prepare the parts that don't change per chunk"""
+        return lambda payload, done: self.build_message(
+            conversation_id, inference_id, payload, done
+        )
+
+    def decode(self, message: Any) -> Tuple[str, str, bytes, bool]:
+        """Returns (conversation_id, inference_id, audio, done)"""
+        raise NotImplementedError
+
+
+class Base64EchoEncoder(EchoEncoder):
+    """JSON conversation.echo messages with base64 audio, as Tavus expects"""
+
+    def encode(self, audio: bytes) -> str:
+        return encode_audio(audio)
+
+    def build_message(
+        self, conversation_id: str, inference_id: str, payload: str, done: bool
+    ) -> Dict[str, Any]:
+        return {
+            "message_type": "conversation",
+            "event_type": "conversation.echo",
+            "conversation_id": conversation_id,
+            "properties": {
+                "modality": "audio",
+                "inference_id": inference_id,
+                "audio": payload,
+                "done": done,
+            },
+        }
+
+    def message_builder(self, conversation_id: str, inference_id: str) -> EchoMessageBuilder:
+        # Messages may still be queued in the transport, so each chunk gets
+        # its own dicts, copied from the template.
+        template = self.build_message(conversation_id, inference_id, "", False)
+        properties = template.pop("properties")
+
+        def build(payload: str, done: bool) -> Dict[str, Any]:
+            message = template.copy()
+            message["properties"] = {**properties, "audio": payload, "done": done}
+            return message
+
+        return build
+
+    def decode(self, message: Dict[str, Any]) -> Tuple[str, str, bytes, bool]:
+        properties = message["properties"]
+        return (
+            message["conversation_id"],
+            properties["inference_id"],
+            base64.b64decode(properties["audio"]),
+            properties["done"],
+        )
+
+
+class BinaryEchoEncoder(EchoEncoder):
+    """Compact binary echo messages: a fixed header, the conversation and
+    inference ids and the raw PCM. Needs a transport that can carry binary
+    messages; Daily app-messages are JSON only"""
+
+    VERSION = 1
+    FLAG_DONE = 0x01
+    # version, flags, conversation id length, inference id length
+    HEADER = struct.Struct("!BBHH")
+
+    def encode(self, audio: bytes) -> bytes:
+        return audio
+
+    def build_message(
+        self, conversation_id: str, inference_id: str, payload: bytes, done: bool
+    ) -> bytes:
+        conversation = conversation_id.encode("utf-8")
+        inference = inference_id.encode("utf-8")
+        header = self.HEADER.pack(
+            self.VERSION, self.FLAG_DONE if done else 0, len(conversation), len(inference)
+        )
+        return b"".join((header, conversation, inference, payload))
+
+    def message_builder(self, conversation_id: str, inference_id: str) -> EchoMessageBuilder:
+        prefix = self.build_message(conversation_id, inference_id, b"", False)
+        done_prefix = self.build_message(conversation_id, inference_id, b"", True)
+        return lambda payload, done: (done_prefix if done else prefix) + payload
+
+    def decode(self, message: bytes) -> Tuple[str, str, bytes, bool]:
+        version, flags, conversation_len, inference_len = self.HEADER.unpack_from(message)
+        if version != self.VERSION:
+            raise ValueError(f"Unsupported echo message version {version}")
+        offset = self.HEADER.size
+        conversation_id = message[offset : offset + conversation_len].decode("utf-8")
+        offset += conversation_len
+        inference_id = message[offset : offset + inference_len].decode("utf-8")
+        offset += inference_len
+        return conversation_id, inference_id, message[offset:], bool(flags & self.FLAG_DONE)
+
+
+class StreamingResampler:
+    """Resamples a stream of 16-bit mono PCM chunks, keeping the filter
+    state between chunks so there are no artifacts at chunk boundaries"""
+
+    def __init__(self, in_rate: int, out_rate: int) -> None:
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self._stream = soxr.ResampleStream(in_rate, out_rate, 1, dtype="int16", quality="HQ")
+        # Odd trailing byte of a chunk, prepended to the next one.
+        self._remainder = b""
+
+    def resample(self, audio: bytes) -> bytes:
+        if self._remainder:
+            audio = self._remainder + audio
+            self._remainder = b""
+        if len(audio) % 2:
+            self._remainder = audio[-1:]
+            audio = audio[:-1]
+        samples = np.frombuffer(audio, dtype=np.int16)
+        return self._stream.resample_chunk(samples).tobytes()
+
+    def flush(self) -> bytes:
+        """Drains the samples still held by the filter and resets the
+        resampler so it can be reused for the next stream"""
+        tail = self._stream.resample_chunk(np.zeros(0, dtype=np.int16), last=True)
+        self.reset()
+        return tail.tobytes()
+
+    def reset(self) -> None:
+        self._stream.clear()
+        self._remainder = b""
+
+
+class PassthroughResampler:
+    """Stand-in for StreamingResampler when the source audio is already at
+    the target rate, so no DSP work is done"""
+
+    def __init__(self, rate: int) -> None:
+        self.in_rate = rate
+        self.out_rate = rate
+
+    def resample(self, audio: bytes) -> bytes:
+        return audio
+
+    def flush(self) -> bytes:
+        return b""
+
+    def reset(self) -> None:
+        pass
+
+
+Resampler = Union[StreamingResampler, PassthroughResampler]
+
+
+class TavusAudioMetricsData(MetricsData):
+    """Audio path metrics of one inference. Times are in seconds"""
+
+    inference_id: str
+    # From TTSStartedFrame to the first echo message pushed to the transport.
+    first_echo_time: Optional[float] = None
+    chunks: int = 0
+    input_bytes: int = 0
+    output_bytes: int = 0
+    resample_time: float = 0.0
+    encode_time: float = 0.0
+    interrupted: bool = False
+
+
+class AudioSendQueue:
+    """Bounded FIFO between process_frame and the audio sender task.
+
+    `clear()` drops everything queued in O(1) by swapping the underlying
+    deque, and wakes producers waiting for space. As with `asyncio.Queue`,
+    the consumer calls `task_done()` for every item it gets, and `join()`
+    waits until every item put has been handled or dropped.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self._maxsize = maxsize
+        self._items: deque = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    async def put(self, item: Any) -> None:
+        while len(self._items) >= self._maxsize:
+            self._not_full.clear()
+            await self._not_full.wait()
+        self._items.append(item)
+        self._unfinished += 1
+        self._finished.clear()
+        self._not_empty.set()
+
+    async def get(self) -> Any:
+        while not self._items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        item = self._items.popleft()
+        self._not_full.set()
+        return item
+
+    def task_done(self) -> None:
+        self._unfinished -= 1
+        if not self._unfinished:
+            self._finished.set()
+
+    async def join(self) -> None:
+        await self._finished.wait()
+
+    def clear(self) -> None:
+        self._unfinished -= len(self._items)
+        if not self._unfinished:
+            self._finished.set()
+        self._items = deque()
+        self._not_full.set()
+
+
+class AudioPacer:
+    """Token bucket, on the monotonic clock, that releases audio at real-time
+    rate while letting up to `lead_ms` of audio get ahead of playback"""
+
+    def __init__(self, lead_ms: int) -> None:
+        self._capacity = lead_ms / 1000
+        self.reset()
+
+    @property
+    def lead_time(self) -> float:
+        """Seconds of audio released ahead of real time"""
+        self._refill()
+        return self._capacity - self._tokens
+
+    def reset(self) -> None:
+        self._tokens = self._capacity
+        self._last_refill = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + now - self._last_refill)
+        self._last_refill = now
+
+    async def acquire(self, duration: float) -> None:
+        """Waits until `duration` seconds of audio may be released. Chunks
+        longer than the lead go out once the bucket is full and leave it in
+        debt, which delays the chunks after them"""
+        self._refill()
+        wait = min(duration, self._capacity) - self._tokens
+        if wait > 0:
+            await asyncio.sleep(wait)
+            self._refill()
+        self._tokens -= duration
+
+
+class PersonaCache:
+    """Process-wide cache of persona metadata, keyed by persona_id.
+
+    Entries younger than `ttl` seconds are returned as is. Older entries,
+    up to `ttl + stale_ttl`, are still returned while a background refresh
+    fetches them again. Concurrent lookups of the same persona share one
+    request. When a file is given, or TAVUS_PERSONA_CACHE_FILE is set, the
+    cache is loaded from it on first use and saved after every fetch, so new
+    bot processes start with it filled.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float = 3600,
+        stale_ttl: float = 86400,
+        max_size: int = 128,
+        path: Optional[str] = None,
+    ) -> None:
+        self._ttl = ttl
+        self._stale_ttl = stale_ttl
+        self._max_size = max_size
+        self._path = path
+        self._loaded = False
+        # persona_id -> (fetched_at, persona), least recently used first
+        self._entries: OrderedDict = OrderedDict()
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._refresh_tasks: Set[asyncio.Task] = set()
+
+    async def get(
+        self, persona_id: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        self._load()
+        entry = self._entries.get(persona_id)
+        if entry:
+            fetched_at, persona = entry
+            age = time.time() - fetched_at
+            if age < self._ttl + self._stale_ttl:
+                self._entries.move_to_end(persona_id)
+                if age >= self._ttl and persona_id not in self._pending:
+                    task = asyncio.create_task(self._refresh(persona_id, fetch))
+                    self._refresh_tasks.add(task)
+                    task.add_done_callback(self._refresh_tasks.discard)
+                return persona
+        return await self._fetch(persona_id, fetch)
+
+    async def _fetch(
+        self, persona_id: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        # The request runs in its own task, so a caller that is cancelled
+        # only stops waiting for it instead of cancelling it for everyone.
+        task = self._pending.get(persona_id)
+        if not task:
+            task = asyncio.create_task(self._fetch_and_put(persona_id, fetch))
+            self._pending[persona_id] = task
+            task.add_done_callback(lambda task: self._fetch_done(persona_id, task))
+        return await asyncio.shield(task)
+
+    async def _fetch_and_put(
+        self, persona_id: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        persona = await fetch()
+        self._put(persona_id, persona)
+        return persona
+
+    def _fetch_done(self, persona_id: str, task: asyncio.Task) -> None:
+        if self._pending.get(persona_id) is task:
+            del self._pending[persona_id]
+        # Mark the exception as retrieved when every caller was cancelled.
+        if not task.cancelled():
+            task.exception()
+
+    async def _refresh(
+        self, persona_id: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> None:
+        try:
+            await self._fetch(persona_id, fetch)
+        except Exception as e:
+            logger.warning(f"Unable to refresh persona {persona_id}, keeping stale entry: {e}")
+
+    def _put(self, persona_id: str, persona: Dict[str, Any]) -> None:
+        self._entries[persona_id] = (time.time(), persona)
+        self._entries.move_to_end(persona_id)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+        self._save()
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        # Read lazily so a .env loaded after import is taken into account.
+        self._path = self._path or os.getenv("TAVUS_PERSONA_CACHE_FILE")
+        if not self._path or not os.path.exists(self._path):
+            return
+        try:
+            with open(self._path) as f:
+                for persona_id, (fetched_at, persona) in json.load(f).items():
+                    self._entries[persona_id] = (fetched_at, persona)
+        except Exception as e:
+            logger.warning(f"Unable to load persona cache {self._path}: {e}")
+
+    def _save(self) -> None:
+        if not self._path:
+            return
+        try:
+            tmp_path = f"{self._path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(dict(self._entries), f)
+            os.replace(tmp_path, self._path)
+        except Exception as e:
+            logger.warning(f"Unable to save persona cache {self._path}: {e}")
+
+
+persona_cache = PersonaCache()
+
+
+async def start_conversation(
+    client: TavusApiClient, replica_id: str, persona_id: str
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Creates a conversation and looks up its persona, through
+    persona_cache, at the same time. If either request fails the other one
+    is cancelled, and a conversation that was created anyway is ended.
+    Returns (conversation, persona)"""
+    timings = {}
+
+    async def timed(name: str, coroutine: Awaitable) -> Any:
+        start_time = time.monotonic()
+        result = await coroutine
+        timings[name] = time.monotonic() - start_time
+        return result
+
+    start_time = time.monotonic()
+    conversation_task = asyncio.create_task(
+        timed("conversation", client.create_conversation(replica_id, persona_id))
+    )
+    persona_task = asyncio.create_task(
+        timed("persona", persona_cache.get(persona_id, lambda: client.get_persona(persona_id)))
+    )
+    tasks = (conversation_task, persona_task)
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            task.result()
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Don't leave a conversation running when only the persona lookup failed.
+        if not conversation_task.cancelled() and not conversation_task.exception():
+            conversation_id = conversation_task.result()["conversation_id"]
+            try:
+                with background_requests():
+                    await client.end_conversation(conversation_id)
+            except Exception as e:
+                logger.error(f"Unable to end conversation {conversation_id}: {e}")
+        raise
+
+    logger.info(
+        f"Tavus conversation started in {time.monotonic() - start_time:.3f}s "
+        f"(conversation {timings['conversation']:.3f}s, persona {timings['persona']:.3f}s)"
+    )
+    return conversation_task.result(), persona_task.result()
+
+
 class TavusVideoService(AIService):
     """Class to send base64 encoded audio to Tavus"""
 
+    class InputParams(BaseModel):
+        # Resampled audio is coalesced into echo messages of at least this
+        # duration. 0 sends every TTS chunk as its own message.
+        audio_chunk_ms: int = 100
+        # Maximum time audio may wait in the coalescing buffer.
+        max_latency_ms: int = 60
+        # Threads used to encode large chunks off the event loop. 0 encodes
+        # everything inline.
+        encoder_threads: int = 0
+        # Chunks of at least this many bytes are encoded in the thread pool.
+        encoder_offload_bytes: int = 32000
+        # Release echo audio to the transport at real-time rate instead of
+        # as fast as TTS produces it.
+        pacing: bool = False
+        # How far ahead of real time paced audio may get.
+        pacing_lead_ms: int = 500
+        # Echo messages waiting for the transport. Bounds how much audio is
+        # still sent after an interruption.
+        send_queue_size: int = 20
+        # Deadline, including retries, for ending the conversation once the
+        # pipeline is shutting down.
+        end_conversation_timeout: float = 5.0
+        # How long an EndFrame waits for queued echo messages, e.g. the end
+        # of the last utterance, to be sent. A CancelFrame drops them.
+        end_drain_timeout: float = 3.0
+
     def __init__(
         self,
         *,
         api_key: str,
         replica_id: str,
         persona_id: str = "pipecat0",
-        session: aiohttp.ClientSession,
+        session: Optional[aiohttp.ClientSession] = None,
+        client: Optional[TavusApiClient] = None,
+        base_url: Optional[str] = None,
+        params: InputParams = InputParams(),
+        echo_encoder: Optional[EchoEncoder] = None,
         **kwargs,
     ) -> None:
         super().__init__(**kwargs)
         self._api_key = api_key
         self._replica_id = replica_id
         self._persona_id = persona_id
-        self._session = session
+        self._client = client or TavusApiClient(
+            api_key=api_key, session=session, base_url=base_url
+        )
+        self._params = params
+        self._echo_encoder = echo_encoder or Base64EchoEncoder()
+        self._build_echo_message: Optional[EchoMessageBuilder] = None
+
+        self._conversation_id: Optional[str] = None
+        self._conversation_url: Optional[str] = None
+        self._teardown_task: Optional[asyncio.Task] = None
+        self._resampler: Optional[Resampler] = None
+        self._resamplers: Dict[Tuple[int, int], Resampler] = {}
+        self._passthrough_frames = 0
+        self._resampled_frames = 0
+
+        # 16-bit mono samples
+        self._audio_chunk_bytes = TAVUS_SAMPLE_RATE * 2 * params.audio_chunk_ms // 1000
+        self._audio_buffer = bytearray()
+        self._first_chunk_sent = False
+        self._flush_task: Optional[asyncio.Task] = None
 
-        self._conversation_id: str
+        self._encode_executor: Optional[ThreadPoolExecutor] = None
+        if params.encoder_threads > 0:
+            self._encode_executor = ThreadPoolExecutor(
+                params.encoder_threads, thread_name_prefix="tavus-encoder"
+            )
+        # Keeps echo messages in order when a chunk is being encoded in the
+        # thread pool and the coalescing deadline fires.
+        self._send_lock = asyncio.Lock()
+
+        self._current_idx_str: Optional[str] = None
+        self._audio_metrics: Optional[TavusAudioMetricsData] = None
+        # Inference whose metrics went out with its done message
+        self._reported_idx_str: Optional[str] = None
+        self._inference_start_time = 0.0
+        self._interrupted_idx_str: Optional[str] = None
+        self._send_queue = AudioSendQueue(params.send_queue_size)
+        self._audio_sender_task: Optional[asyncio.Task] = None
+        self._pacer: Optional[AudioPacer] = None
+        if params.pacing:
+            self._pacer = AudioPacer(params.pacing_lead_ms)
 
     async def initialize(self) -> str:
-        url = "https://tavusapi.com/v2/conversations"
-        headers = {"Content-Type": "application/json", "x-api-key": self._api_key}
-        payload = {
-            "replica_id": self._replica_id,
-            "persona_id": self._persona_id,
-        }
-        async with self._session.post(url, headers=headers, json=payload) as r:
-            r.raise_for_status()
-            response_json = await r.json()
+        response_json = await self._client.create_conversation(
+            self._replica_id, self._persona_id
+        )
 
         logger.debug(f"TavusVideoService joined {response_json['conversation_url']}")
         self._conversation_id = response_json["conversation_id"]
-        return response_json["conversation_url"]
+        self._conversation_url = response_json["conversation_url"]
+        return self._conversation_url
+
+    def use_conversation(self, conversation_id: str, conversation_url: str) -> None:
+        """Uses a conversation created elsewhere, e.g. by the app server,
+        instead of creating one with initialize()"""
+        self._conversation_id = conversation_id
+        self._conversation_url = conversation_url
+
+    async def start_conversation(self) -> Tuple[str, str]:
+        """Creates the conversation and looks up the persona name at the same
+        time, see start_conversation(). Returns (conversation_url,
+        persona_name)"""
+        conversation, persona = await start_conversation(
+            self._client, self._replica_id, self._persona_id
+        )
+        logger.debug(f"TavusVideoService joined {conversation['conversation_url']}")
+        self._conversation_id = conversation["conversation_id"]
+        self._conversation_url = conversation["conversation_url"]
+        return self._conversation_url, persona["persona_name"]
+
+    @property
+    def conversation_id(self) -> str:
+        return self._conversation_id
+
+    @property
+    def conversation_url(self) -> str:
+        return self._conversation_url
 
     def can_generate_metrics(self) -> bool:
         return True
 
+    @property
+    def pacing_stats(self) -> Dict[str, float]:
+        """Echo messages waiting to be paced out and how far ahead of real
+        time the current inference is, in milliseconds"""
+        if not self._pacer:
+            return {}
+        return {
+            "queue_depth": self._send_queue.qsize(),
+            "lead_ms": self._pacer.lead_time * 1000,
+        }
+
+    async def start(self, frame: StartFrame):
+        await super().start(frame)
+        self._audio_sender_task = self.get_event_loop().create_task(
+            self._audio_sender_handler()
+        )
+
+    async def _cancel_audio_sender(self) -> None:
+        if self._audio_sender_task:
+            self._audio_sender_task.cancel()
+            try:
+                await self._audio_sender_task
+            except asyncio.CancelledError:
+                pass
+            self._audio_sender_task = None
+
+    async def _drain_audio_sender(self) -> None:
+        if not self._audio_sender_task:
+            return
+        timeout = self._params.end_drain_timeout
+        try:
+            await asyncio.wait_for(self._send_queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"TavusVideoService dropped {self._send_queue.qsize()} echo messages "
+                f"still queued after {timeout}s"
+            )
+
+    @property
+    def _interrupted(self) -> bool:
+        return self._interrupted_idx_str == self._current_idx_str
+
+    async def _audio_sender_handler(self) -> None:
+        inference_id = None
+        while True:
+            metrics, duration, done, frame = await self._send_queue.get()
+            try:
+                inference_id = await self._send_echo_message(
+                    metrics, duration, done, frame, inference_id
+                )
+            except Exception as e:
+                # The sender has to keep going: once it stops, the queue
+                # fills up and process_frame blocks for good.
+                logger.error(f"TavusVideoService unable to send echo message: {e}")
+            finally:
+                self._send_queue.task_done()
+
+    async def _send_echo_message(
+        self,
+        metrics: TavusAudioMetricsData,
+        duration: float,
+        done: bool,
+        frame: TransportMessageUrgentFrame,
+        inference_id: Optional[str],
+    ) -> Optional[str]:
+        """Sends a queued echo message unless its inference was interrupted.
+        Returns the inference being paced"""
+        if metrics.inference_id == self._interrupted_idx_str:
+            return inference_id
+        if self._pacer:
+            if metrics.inference_id != inference_id:
+                self._pacer.reset()
+            await self._pacer.acquire(duration)
+            logger.trace(f"TavusVideoService pacing {self.pacing_stats}")
+            # The inference may have been interrupted while waiting.
+            if metrics.inference_id == self._interrupted_idx_str:
+                return inference_id
+        await self.push_frame(frame)
+
+        if metrics.first_echo_time is None:
+            metrics.first_echo_time = time.monotonic() - self._inference_start_time
+            await self.stop_ttfb_metrics()
+        if done:
+            self._reported_idx_str = metrics.inference_id
+            await self._push_audio_metrics(metrics)
+        return metrics.inference_id
+
+    async def _push_audio_metrics(self, metrics: TavusAudioMetricsData) -> None:
+        logger.debug(f"TavusVideoService audio metrics: {metrics}")
+        if self.can_generate_metrics() and self.metrics_enabled:
+            await self.push_frame(MetricsFrame(data=[metrics]))
+
     async def get_persona_name(self) -> str:
-        url = f"https://tavusapi.com/v2/personas/{self._persona_id}"
-        headers = {"Content-Type": "application/json", "x-api-key": self._api_key}
-        async with self._session.get(url, headers=headers) as r:
-            r.raise_for_status()
-            response_json = await r.json()
+        persona = await persona_cache.get(self._persona_id, self._fetch_persona)
+        return persona["persona_name"]
+
+    async def _fetch_persona(self) -> Dict[str, Any]:
+        response_json = await self._client.get_persona(self._persona_id)
 
         logger.debug(f"TavusVideoService persona grabbed {response_json}")
-        return response_json["persona_name"]
+        return response_json
 
-    async def _end_conversation(self) -> None:
-        url = f"https://tavusapi.com/v2/conversations/{self._conversation_id}/end"
-        headers = {"Content-Type": "application/json", "x-api-key": self._api_key}
-        async with self._session.post(url, headers=headers) as r:
-            r.raise_for_status()
+    async def end_conversation(self) -> None:
+        await self._client.end_conversation(self._conversation_id)
 
-    async def _encode_audio_and_send(
-        self, audio: bytes, original_sample_rate: int, done: bool
-    ) -> None:
-        """Encodes audio to base64 and sends it to Tavus"""
-        if not done:
-            audio = resample_audio(audio, original_sample_rate, 16000)
-        audio_base64 = base64.b64encode(audio).decode("utf-8")
-        logger.trace(f"TavusVideoService sending {len(audio)} bytes")
-        await self._send_audio_message(audio_base64, done=done)
+    def _start_teardown(self) -> None:
+        """Ends the conversation in the background so the shutdown frame can
+        be pushed right away"""
+        if self._conversation_id and not self._teardown_task:
+            self._teardown_task = self.get_event_loop().create_task(self._teardown())
+
+    async def _teardown(self) -> None:
+        timeout = self._params.end_conversation_timeout
+        try:
+            await asyncio.wait_for(self.end_conversation(), timeout=timeout)
+            logger.debug(f"TavusVideoService ended conversation {self._conversation_id}")
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"TavusVideoService gave up ending conversation {self._conversation_id} "
+                f"after {timeout}s"
+            )
+        except Exception as e:
+            logger.error(f"TavusVideoService unable to end conversation {self._conversation_id}: {e}")
+
+    async def cleanup(self):
+        await super().cleanup()
+        # Keep the process alive until the conversation is ended, bounded by
+        # end_conversation_timeout.
+        if self._teardown_task:
+            await self._teardown_task
+
+    @property
+    def sample_rate(self) -> int:
+        """Sample rate Tavus expects. Upstream TTS services should be
+        configured to produce audio at this rate so it can be passed
+        through without resampling"""
+        return TAVUS_SAMPLE_RATE
+
+    @property
+    def resample_stats(self) -> Dict[str, int]:
+        """Number of audio frames that were already at 16 kHz and those that
+        had to be resampled"""
+        return {
+            "passthrough_frames": self._passthrough_frames,
+            "resampled_frames": self._resampled_frames,
+        }
+
+    def _get_resampler(self, sample_rate: int) -> Resampler:
+        """Returns the resampler for the current inference. Resamplers are
+        cached per (source, target) rate so they are reused between
+        inferences"""
+        if self._resampler and self._resampler.in_rate == sample_rate:
+            return self._resampler
+
+        if self._resampler:
+            self._resampler.reset()
+
+        key = (sample_rate, TAVUS_SAMPLE_RATE)
+        resampler = self._resamplers.get(key)
+        if not resampler:
+            if sample_rate == TAVUS_SAMPLE_RATE:
+                resampler = PassthroughResampler(sample_rate)
+            else:
+                logger.warning(
+                    f"TavusVideoService received {sample_rate} Hz audio, expected "
+                    f"{TAVUS_SAMPLE_RATE} Hz. Configure the TTS service with "
+                    f"sample_rate={TAVUS_SAMPLE_RATE} to avoid resampling."
+                )
+                resampler = StreamingResampler(sample_rate, TAVUS_SAMPLE_RATE)
+            self._resamplers[key] = resampler
+        self._resampler = resampler
+        return resampler
+
+    async def _flush_resampler(self) -> None:
+        if self._resampler:
+            start_time = time.perf_counter()
+            tail = self._resampler.flush()
+            self._audio_metrics.resample_time += time.perf_counter() - start_time
+            if tail:
+                await self._buffer_audio(tail)
+
+    async def _resample_and_send(self, audio: bytes, sample_rate: int) -> None:
+        if sample_rate == TAVUS_SAMPLE_RATE:
+            self._passthrough_frames += 1
+        else:
+            self._resampled_frames += 1
+        self._audio_metrics.input_bytes += len(audio)
+        start_time = time.perf_counter()
+        audio = self._get_resampler(sample_rate).resample(audio)
+        self._audio_metrics.resample_time += time.perf_counter() - start_time
+        if audio:
+            await self._buffer_audio(audio)
+
+    async def _buffer_audio(self, audio: bytes) -> None:
+        """Coalesces resampled audio into echo messages of `audio_chunk_ms`.
+        The first chunk of every inference is sent right away so buffering
+        doesn't delay the start of speech"""
+        if not self._first_chunk_sent:
+            self._first_chunk_sent = True
+            await self._encode_audio_and_send(audio, done=False)
+            return
+
+        self._audio_buffer.extend(audio)
+        if len(self._audio_buffer) >= self._audio_chunk_bytes:
+            await self._flush_audio_buffer()
+        elif not self._flush_task:
+            self._flush_task = self.get_event_loop().create_task(self._flush_after_deadline())
+
+    async def _flush_audio_buffer(self) -> None:
+        self._cancel_flush_task()
+        if self._audio_buffer:
+            audio = bytes(self._audio_buffer)
+            self._audio_buffer.clear()
+            await self._encode_audio_and_send(audio, done=False)
+
+    async def _flush_after_deadline(self) -> None:
+        await asyncio.sleep(self._params.max_latency_ms / 1000)
+        self._flush_task = None
+        await self._flush_audio_buffer()
+
+    def _cancel_flush_task(self) -> None:
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+
+    def _reset_audio(self) -> None:
+        self._cancel_flush_task()
+        self._audio_buffer.clear()
+        self._first_chunk_sent = False
+        if self._resampler:
+            self._resampler.reset()
+
+    async def _encode_audio(self, audio: bytes) -> Any:
+        if self._encode_executor and len(audio) >= self._params.encoder_offload_bytes:
+            return await self.get_event_loop().run_in_executor(
+                self._encode_executor, self._echo_encoder.encode, audio
+            )
+        return self._echo_encoder.encode(audio)
+
+    async def _encode_audio_and_send(self, audio: bytes, done: bool) -> None:
+        """Encodes 16 kHz audio with the echo encoder and sends it to Tavus"""
+        metrics = self._audio_metrics
+        async with self._send_lock:
+            start_time = time.perf_counter()
+            payload = await self._encode_audio(audio)
+            metrics.encode_time += time.perf_counter() - start_time
+            logger.trace(f"TavusVideoService sending {len(audio)} bytes")
+            duration = 0.0
+            if not done:
+                duration = len(audio) / (TAVUS_SAMPLE_RATE * 2)
+                metrics.chunks += 1
+                metrics.output_bytes += len(audio)
+            await self._send_audio_message(payload, done, duration, metrics)
 
     async def process_frame(self, frame: Frame, direction: FrameDirection):
         await super().process_frame(frame, direction)
@@ -97,16 +889,51 @@ class TavusVideoService(AIService):
             await self.start_processing_metrics()
             await self.start_ttfb_metrics()
             self._current_idx_str = str(frame.id)
+            self._inference_start_time = time.monotonic()
+            self._audio_metrics = TavusAudioMetricsData(
+                processor=self.name, inference_id=self._current_idx_str
+            )
+            self._build_echo_message = self._echo_encoder.message_builder(
+                self._conversation_id, self._current_idx_str
+            )
+            self._reset_audio()
         elif isinstance(frame, TTSAudioRawFrame):
-            await self._encode_audio_and_send(frame.audio, frame.sample_rate, done=False)
-        elif isinstance(frame, TTSStoppedFrame):
-            await self._encode_audio_and_send(b"\x00", 16000, done=True)
+            # Audio of an interrupted inference still in flight is dropped.
+            if not self._interrupted:
+                await self._resample_and_send(frame.audio, frame.sample_rate)
+        elif isinstance(frame, TTSStoppedFrame) and self._interrupted:
             await self.stop_ttfb_metrics()
             await self.stop_processing_metrics()
+        elif isinstance(frame, TTSStoppedFrame):
+            await self._flush_resampler()
+            await self._flush_audio_buffer()
+            await self._encode_audio_and_send(b"\x00", done=True)
+            await self.stop_processing_metrics()
         elif isinstance(frame, StartInterruptionFrame):
+            # A barge-in after the done message went out doesn't cut the
+            # inference short, and its metrics were already reported.
+            interrupted = (
+                self._audio_metrics
+                and not self._interrupted
+                and self._audio_metrics.inference_id != self._reported_idx_str
+            )
+            self._interrupted_idx_str = self._current_idx_str
+            self._send_queue.clear()
+            self._reset_audio()
+            if interrupted:
+                self._audio_metrics.interrupted = True
+                await self._push_audio_metrics(self._audio_metrics)
             await self._send_interrupt_message()
         elif isinstance(frame, (EndFrame, CancelFrame)):
-            await self._end_conversation()
+            if isinstance(frame, EndFrame):
+                await self._drain_audio_sender()
+            self._cancel_flush_task()
+            await self._cancel_audio_sender()
+            logger.debug(f"TavusVideoService audio frames: {self.resample_stats}")
+            if self._encode_executor:
+                self._encode_executor.shutdown(wait=False)
+            self._start_teardown()
+            await self.push_frame(frame, direction)
         else:
             await self.push_frame(frame, direction)
 
@@ -120,18 +947,10 @@ class TavusVideoService(AIService):
         )
         await self.push_frame(transport_frame)
 
-    async def _send_audio_message(self, audio_base64: str, done: bool) -> None:
+    async def _send_audio_message(
+        self, payload: Any, done: bool, duration: float, metrics: TavusAudioMetricsData
+    ) -> None:
         transport_frame = TransportMessageUrgentFrame(
-            message={
-                "message_type": "conversation",
-                "event_type": "conversation.echo",
-                "conversation_id": self._conversation_id,
-                "properties": {
-                    "modality": "audio",
-                    "inference_id": self._current_idx_str,
-                    "audio": audio_base64,
-                    "done": done,
-                },
-            }
+            message=self._build_echo_message(payload, done)
         )
-        await self.push_frame(transport_frame)
+        await self._send_queue.put((metrics, duration, done, transport_frame))
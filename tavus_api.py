@@ -0,0 +1,362 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Client for the Tavus REST API"""
+
+import aiohttp
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+TAVUS_API_URL = "https://tavusapi.com/v2"
+
+
+class RequestPriority(IntEnum):
+    # Requests a user is waiting on, e.g. creating their conversation
+    INTERACTIVE = 0
+    # Pool refills, cleanup and other background work
+    BACKGROUND = 1
+
+
+request_priority: ContextVar[RequestPriority] = ContextVar(
+    "tavus_request_priority", default=RequestPriority.INTERACTIVE
+)
+
+
+@contextmanager
+def background_requests():
+    """Schedules the Tavus API calls made inside the block behind interactive
+    ones"""
+    token = request_priority.set(RequestPriority.BACKGROUND)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, in seconds or HTTP-date form"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _KeyBucket:
+    def __init__(self, burst: int) -> None:
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        # (priority, sequence, future)
+        self.waiters: List = []
+        self.dispatcher: Optional[asyncio.Task] = None
+
+
+class RequestScheduler:
+    """Token bucket per API key in front of Tavus API calls.
+
+    When the bucket is empty, calls wait in priority order, interactive
+    calls first. A 429 with Retry-After pauses the key's bucket for that
+    long. Queue wait times are recorded per priority.
+    """
+
+    def __init__(self, *, rate: float = 5.0, burst: int = 10) -> None:
+        self._rate = rate
+        self._burst = burst
+        self._buckets: Dict[str, _KeyBucket] = {}
+        self._sequence = itertools.count()
+        self._waits = {
+            priority: {"count": 0, "total": 0.0, "max": 0.0} for priority in RequestPriority
+        }
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Queue wait time per priority, in seconds, and calls waiting now"""
+        stats = {}
+        for priority, waits in self._waits.items():
+            count = waits["count"]
+            stats[priority.name.lower()] = {
+                "requests": count,
+                "mean_wait": waits["total"] / count if count else 0.0,
+                "max_wait": waits["max"],
+            }
+        stats["waiting"] = sum(len(bucket.waiters) for bucket in self._buckets.values())
+        return stats
+
+    async def acquire(self, key: str, priority: RequestPriority) -> float:
+        """Waits for a token for `key`. Returns the time spent waiting"""
+        bucket = self._buckets.get(key)
+        if not bucket:
+            bucket = self._buckets[key] = _KeyBucket(self._burst)
+
+        start_time = time.monotonic()
+        if not bucket.waiters and self._time_until_token(bucket) == 0:
+            bucket.tokens -= 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(bucket.waiters, (priority, next(self._sequence), future))
+            if not bucket.dispatcher:
+                bucket.dispatcher = asyncio.create_task(self._dispatch(bucket))
+            await future
+
+        wait = time.monotonic() - start_time
+        waits = self._waits[priority]
+        waits["count"] += 1
+        waits["total"] += wait
+        waits["max"] = max(waits["max"], wait)
+        return wait
+
+    def pause(self, key: str, seconds: float) -> None:
+        """Holds every call for `key` for `seconds`, e.g. after a 429"""
+        bucket = self._buckets.get(key)
+        if bucket:
+            bucket.paused_until = max(bucket.paused_until, time.monotonic() + seconds)
+            bucket.tokens = min(bucket.tokens, 0.0)
+
+    def _time_until_token(self, bucket: _KeyBucket) -> float:
+        now = time.monotonic()
+        bucket.tokens = min(self._burst, bucket.tokens + (now - bucket.last_refill) * self._rate)
+        bucket.last_refill = now
+        if now < bucket.paused_until:
+            return bucket.paused_until - now
+        if bucket.tokens >= 1:
+            return 0.0
+        return (1 - bucket.tokens) / self._rate
+
+    async def _dispatch(self, bucket: _KeyBucket) -> None:
+        try:
+            while bucket.waiters:
+                delay = self._time_until_token(bucket)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                _, _, future = heapq.heappop(bucket.waiters)
+                if future.done():
+                    # The caller was cancelled while waiting
+                    continue
+                bucket.tokens -= 1
+                future.set_result(None)
+        finally:
+            bucket.dispatcher = None
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the Tavus API while the circuit is open"""
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures so calls fail fast
+    for `reset_timeout` seconds. After that a single trial call is let
+    through: success closes the circuit, failure opens it again"""
+
+    def __init__(self, *, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self._reset_timeout:
+            return "open"
+        return "half-open"
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == "open" or (state == "half-open" and self._trial_running):
+            raise CircuitOpenError("Tavus API circuit breaker is open")
+        if state == "half-open":
+            self._trial_running = True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_running = False
+        if self._opened_at is not None or self._failures >= self._failure_threshold:
+            if self._opened_at is None:
+                logger.warning(f"Tavus API failed {self._failures} times, opening circuit")
+            self._opened_at = time.monotonic()
+
+    def record_ignored(self) -> None:
+        """The call neither proved nor disproved that the API is healthy"""
+        self._trial_running = False
+
+
+class TavusApiClient:
+    """Shared client for the Tavus REST API.
+
+    Idempotent calls are retried with jittered exponential backoff on
+    connection errors, timeouts and 5xx responses, and every call on 429,
+    waiting at least as long as Retry-After. Every call has a
+    timeout, and a circuit breaker makes calls fail fast while the API keeps
+    failing. Create one per process and share it, so connections are kept
+    alive between calls.
+    """
+
+    def __init__(
+        self,
+        *,
+        api_key: str,
+        session: Optional[aiohttp.ClientSession] = None,
+        base_url: Optional[str] = None,
+        timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        scheduler: Optional[RequestScheduler] = None,
+    ) -> None:
+        self._api_key = api_key
+        self._session = session
+        self._owns_session = session is None
+        # TAVUS_API_URL can point at a stand-in server, see tavus_standin.py
+        base_url = base_url or os.getenv("TAVUS_API_URL", TAVUS_API_URL)
+        self._base_url = base_url.rstrip("/")
+        self._timeout = timeout
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._circuit_breaker = circuit_breaker or CircuitBreaker()
+        self._scheduler = scheduler
+
+    @staticmethod
+    def create_session(
+        *,
+        limit: int = 100,
+        limit_per_host: int = 50,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+    ) -> aiohttp.ClientSession:
+        """A session with a connection pool and DNS cache suited to sharing
+        between many concurrent Tavus calls"""
+        connector = aiohttp.TCPConnector(
+            limit=limit,
+            limit_per_host=limit_per_host,
+            ttl_dns_cache=dns_cache_ttl,
+            keepalive_timeout=keepalive_timeout,
+        )
+        return aiohttp.ClientSession(connector=connector)
+
+    @property
+    def circuit_breaker(self) -> CircuitBreaker:
+        return self._circuit_breaker
+
+    @property
+    def scheduler(self) -> Optional[RequestScheduler]:
+        return self._scheduler
+
+    async def close(self) -> None:
+        if self._owns_session and self._session:
+            await self._session.close()
+            self._session = None
+
+    async def create_conversation(self, replica_id: str, persona_id: str) -> Dict[str, Any]:
+        # Only retried on 429: a retry after a lost response would create a
+        # second conversation.
+        payload = {"replica_id": replica_id, "persona_id": persona_id}
+        return await self._request("POST", "/conversations", json=payload, idempotent=False)
+
+    async def get_persona(self, persona_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/personas/{persona_id}", idempotent=True)
+
+    async def end_conversation(self, conversation_id: str) -> None:
+        await self._request(
+            "POST", f"/conversations/{conversation_id}/end", idempotent=True, read_json=False
+        )
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        idempotent: bool,
+        json: Optional[Dict[str, Any]] = None,
+        read_json: bool = True,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        if not self._session:
+            self._session = self.create_session()
+
+        url = f"{self._base_url}{path}"
+        headers = {"Content-Type": "application/json", "x-api-key": self._api_key}
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self._timeout)
+        attempts = self._max_retries + 1
+
+        for attempt in range(attempts):
+            # Queue for a token before claiming the circuit breaker's trial
+            # call, so a call cancelled while it waits can't hold the trial.
+            if self._scheduler:
+                wait = await self._scheduler.acquire(self._api_key, request_priority.get())
+                if wait > 0.1:
+                    logger.debug(f"Tavus API {method} {path} waited {wait:.2f}s in queue")
+            self._circuit_breaker.before_call()
+            retry_after = None
+            try:
+                async with self._session.request(
+                    method, url, headers=headers, json=json, timeout=client_timeout
+                ) as r:
+                    r.raise_for_status()
+                    result = await r.json() if read_json else None
+                self._circuit_breaker.record_success()
+                return result
+            except aiohttp.ClientResponseError as e:
+                if e.status == 429:
+                    # Rate limited: the API is healthy and the request wasn't
+                    # processed, so it's safe to retry even if not idempotent.
+                    self._circuit_breaker.record_ignored()
+                    retry_after = parse_retry_after(e.headers.get("Retry-After") if e.headers else None)
+                    if retry_after is not None and self._scheduler:
+                        self._scheduler.pause(self._api_key, retry_after)
+                elif e.status >= 500:
+                    self._circuit_breaker.record_failure()
+                    if not idempotent:
+                        raise
+                else:
+                    self._circuit_breaker.record_ignored()
+                    raise
+                error = e
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                self._circuit_breaker.record_failure()
+                if not idempotent:
+                    raise
+                error = e
+            except BaseException:
+                self._circuit_breaker.record_ignored()
+                raise
+
+            if attempt + 1 == attempts:
+                raise error
+            delay = random.uniform(0, min(self._backoff_max, self._backoff_base * 2**attempt))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            logger.warning(
+                f"Tavus API {method} {path} failed ({error!r}), retrying in {delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
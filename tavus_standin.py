@@ -0,0 +1,189 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Local stand-in for the Tavus REST API, for offline load testing.
+
+Implements the endpoints TavusVideoService uses, with configurable latency,
+error rate and rate limit. Point the app or the bots at it with:
+
+    python tavus_standin.py --port 8765 --latency lognormal:-2.5,0.5 --error-rate 0.01
+    TAVUS_API_URL=http://localhost:8765/v2 python app.py
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import time
+import uuid
+
+from collections import Counter
+from typing import Callable, Optional
+
+from aiohttp import web
+from loguru import logger
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Latency distributions, in seconds:
+
+    fixed:S, uniform:MIN,MAX, exp:MEAN, lognormal:MU,SIGMA (of ln seconds)
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",")] if args else []
+    distributions = {
+        "fixed": (1, lambda rng: values[0]),
+        "uniform": (2, lambda rng: rng.uniform(values[0], values[1])),
+        "exp": (1, lambda rng: rng.expovariate(1 / values[0])),
+        "lognormal": (2, lambda rng: rng.lognormvariate(values[0], values[1])),
+    }
+    if kind not in distributions:
+        raise argparse.ArgumentTypeError(f"Unknown latency distribution: {spec}")
+    count, latency = distributions[kind]
+    if len(values) != count:
+        raise argparse.ArgumentTypeError(
+            f"{kind} latency takes {count} value{'s' if count > 1 else ''}, got {len(values)}: {spec}"
+        )
+    return latency
+
+
+class RateLimiter:
+    """Token bucket of `rate` requests per second with `burst` capacity"""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self._rate = rate
+        self._capacity = burst
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+
+    def acquire(self) -> float:
+        """Takes a token. Returns 0 on success, or the seconds until one is
+        available"""
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._last_refill) * self._rate)
+        self._last_refill = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self._rate
+
+
+class TavusStandIn:
+    def __init__(
+        self,
+        *,
+        latency: Callable[[random.Random], float],
+        error_rate: float = 0.0,
+        rate_limit: float = 0.0,
+        burst: int = 10,
+        seed: Optional[int] = None,
+    ) -> None:
+        self._latency = latency
+        self._error_rate = error_rate
+        self._rate_limiter = RateLimiter(rate_limit, burst) if rate_limit > 0 else None
+        self._rng = random.Random(seed)
+        self._conversations = {}
+        self._stats = Counter()
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post("/v2/conversations", self._create_conversation)
+        app.router.add_get("/v2/personas/{persona_id}", self._get_persona)
+        app.router.add_post("/v2/conversations/{conversation_id}/end", self._end_conversation)
+        app.router.add_get("/stats", self._get_stats)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        if request.path == "/stats":
+            return await handler(request)
+
+        self._stats["requests"] += 1
+        if request.headers.get("x-api-key") is None:
+            self._stats["401"] += 1
+            return web.json_response({"message": "Missing x-api-key"}, status=401)
+
+        if self._rate_limiter:
+            retry_after = self._rate_limiter.acquire()
+            if retry_after:
+                self._stats["429"] += 1
+                return web.json_response(
+                    {"message": "Rate limit exceeded"},
+                    status=429,
+                    headers={"Retry-After": str(math.ceil(retry_after))},
+                )
+
+        await asyncio.sleep(self._latency(self._rng))
+        if self._rng.random() < self._error_rate:
+            self._stats["500"] += 1
+            return web.json_response({"message": "Injected error"}, status=500)
+
+        response = await handler(request)
+        self._stats[str(response.status)] += 1
+        return response
+
+    async def _create_conversation(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        conversation_id = f"c{uuid.uuid4().hex[:12]}"
+        self._conversations[conversation_id] = "active"
+        return web.json_response(
+            {
+                "conversation_id": conversation_id,
+                "conversation_name": f"Stand-in {conversation_id}",
+                "conversation_url": f"https://tavus.daily.co/{conversation_id}",
+                "status": "active",
+                "replica_id": body.get("replica_id"),
+                "persona_id": body.get("persona_id"),
+            }
+        )
+
+    async def _get_persona(self, request: web.Request) -> web.Response:
+        persona_id = request.match_info["persona_id"]
+        return web.json_response({"persona_id": persona_id, "persona_name": f"Persona {persona_id}"})
+
+    async def _end_conversation(self, request: web.Request) -> web.Response:
+        conversation_id = request.match_info["conversation_id"]
+        if conversation_id not in self._conversations:
+            return web.json_response({"message": "Conversation not found"}, status=404)
+        self._conversations[conversation_id] = "ended"
+        return web.Response(status=200)
+
+    async def _get_stats(self, request: web.Request) -> web.Response:
+        active = sum(1 for status in self._conversations.values() if status == "active")
+        return web.json_response(
+            {"responses": dict(self._stats), "active_conversations": active}
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Tavus API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--latency",
+        type=parse_latency,
+        default="fixed:0",
+        help="fixed:S, uniform:MIN,MAX, exp:MEAN or lognormal:MU,SIGMA (seconds)",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 500s")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests/s, 0 = off")
+    parser.add_argument("--burst", type=int, default=10, help="Rate limit burst")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    standin = TavusStandIn(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        burst=args.burst,
+        seed=args.seed,
+    )
+    logger.info(f"Tavus stand-in listening on http://{args.host}:{args.port}/v2")
+    web.run_app(standin.create_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Conformance tests every echo encoder has to pass"""
+
+import os
+
+import pytest
+
+from tavus import Base64EchoEncoder, BinaryEchoEncoder
+
+ENCODERS = [Base64EchoEncoder, BinaryEchoEncoder]
+INFERENCE_IDS = ["1", "inference-é"]
+
+
+def make_audio(seconds: float, sample_rate: int = 16000) -> bytes:
+    """Random 16-bit mono PCM, so encoders can't take shortcuts"""
+    return os.urandom(int(seconds * sample_rate) * 2)
+
+
+@pytest.fixture(params=ENCODERS, ids=lambda cls: cls.__name__)
+def encoder(request):
+    return request.param()
+
+
+@pytest.mark.parametrize("inference_id", INFERENCE_IDS)
+@pytest.mark.parametrize(
+    "audio,done",
+    [(make_audio(0.1), False), (b"", False), (b"\x00", True)],
+    ids=["audio", "empty", "done"],
+)
+def test_build_message_round_trip(encoder, inference_id, audio, done):
+    message = encoder.build_message("c123", inference_id, encoder.encode(audio), done)
+    assert encoder.decode(message) == ("c123", inference_id, audio, done)
+
+
+@pytest.mark.parametrize("inference_id", INFERENCE_IDS)
+@pytest.mark.parametrize("done", [False, True])
+@pytest.mark.parametrize("audio", [make_audio(0.1), b""], ids=["audio", "empty"])
+def test_message_builder_round_trip(encoder, inference_id, audio, done):
+    build = encoder.message_builder("c123", inference_id)
+    message = build(encoder.encode(audio), done)
+    assert encoder.decode(message) == ("c123", inference_id, audio, done)
+
+
+@pytest.mark.parametrize("inference_id", INFERENCE_IDS)
+def test_message_builder_matches_build_message(encoder, inference_id):
+    build = encoder.message_builder("c123", inference_id)
+    payload = encoder.encode(make_audio(0.1))
+    for done in (False, True):
+        assert build(payload, done) == encoder.build_message("c123", inference_id, payload, done)
+
+
+def test_sliced_encoding(encoder):
+    # Long chunks are encoded in slices, which has to match encoding the
+    # whole chunk at once.
+    audio = make_audio(3.0)
+    message = encoder.build_message("c123", "1", encoder.encode(audio), False)
+    assert encoder.decode(message)[2] == audio
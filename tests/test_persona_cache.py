@@ -0,0 +1,101 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Tests for the shared persona lookup of PersonaCache"""
+
+import asyncio
+
+import pytest
+
+from tavus import PersonaCache
+
+PERSONA = {"persona_id": "p1", "persona_name": "Pipecat"}
+
+
+class Fetch:
+    """A persona request that returns, or raises, once released"""
+
+    def __init__(self, result=PERSONA) -> None:
+        self.calls = 0
+        self.release = asyncio.Event()
+        self._result = result
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if isinstance(self._result, Exception):
+            raise self._result
+        return self._result
+
+
+def test_concurrent_lookups_share_one_request():
+    async def run():
+        cache = PersonaCache()
+        fetch = Fetch()
+        callers = [asyncio.create_task(cache.get("p1", fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        fetch.release.set()
+        assert await asyncio.gather(*callers) == [PERSONA] * 3
+        assert fetch.calls == 1
+
+    asyncio.run(run())
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def run():
+        cache = PersonaCache()
+        fetch = Fetch()
+        a = asyncio.create_task(cache.get("p1", fetch))
+        b = asyncio.create_task(cache.get("p1", fetch))
+        await asyncio.sleep(0)
+
+        a.cancel()
+        await asyncio.sleep(0)
+        fetch.release.set()
+
+        assert await b == PERSONA
+        assert a.cancelled()
+        assert fetch.calls == 1
+        # The request finished for b, so the next lookup is a cache hit
+        assert await cache.get("p1", Fetch()) == PERSONA
+
+    asyncio.run(run())
+
+
+def test_request_finishes_when_every_caller_is_cancelled():
+    async def run():
+        cache = PersonaCache()
+        fetch = Fetch()
+        a = asyncio.create_task(cache.get("p1", fetch))
+        await asyncio.sleep(0)
+        a.cancel()
+        await asyncio.sleep(0)
+        fetch.release.set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        assert await cache.get("p1", Fetch()) == PERSONA
+
+    asyncio.run(run())
+
+
+def test_failed_request_is_shared_and_not_cached():
+    async def run():
+        cache = PersonaCache()
+        fetch = Fetch(ValueError("persona lookup failed"))
+        callers = [asyncio.create_task(cache.get("p1", fetch)) for _ in range(2)]
+        await asyncio.sleep(0)
+        fetch.release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert fetch.calls == 1
+
+        retry = Fetch()
+        retry.release.set()
+        assert await cache.get("p1", retry) == PERSONA
+        assert retry.calls == 1
+
+    asyncio.run(run())
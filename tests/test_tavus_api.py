@@ -0,0 +1,207 @@
+#
+# Copyright (c) 2024, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Tests for the retries, circuit breaker and scheduler of TavusApiClient"""
+
+import asyncio
+import time
+
+from contextlib import asynccontextmanager
+
+import aiohttp
+import pytest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from tavus_api import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RequestPriority,
+    RequestScheduler,
+    TavusApiClient,
+    background_requests,
+)
+
+PERSONA = {"persona_id": "p1", "persona_name": "Pipecat"}
+
+
+@asynccontextmanager
+async def tavus_api(responses, **client_args):
+    """A client for a server answering GET /personas/{id} with `responses`,
+    a list of (status, headers) used in turn, the last one repeated.
+    Yields the client and the list of persona ids requested"""
+    requests = []
+
+    async def get_persona(request):
+        requests.append(request.match_info["persona_id"])
+        status, headers = responses[min(len(requests), len(responses)) - 1]
+        if status == 200:
+            return web.json_response(PERSONA)
+        return web.Response(status=status, headers=headers)
+
+    app = web.Application()
+    app.router.add_get("/personas/{persona_id}", get_persona)
+    async with TestServer(app) as server:
+        client_args.setdefault("backoff_base", 0.01)
+        client = TavusApiClient(api_key="key", base_url=str(server.make_url("")), **client_args)
+        try:
+            yield client, requests
+        finally:
+            await client.close()
+
+
+def test_circuit_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_lets_one_trial_call_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.05)
+    assert breaker.state == "half-open"
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # A failed trial opens the circuit again
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    time.sleep(0.05)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_open_circuit_fails_fast_without_calling_the_api():
+    async def run():
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        async with tavus_api([(500, {})], max_retries=0, circuit_breaker=breaker) as (
+            client,
+            requests,
+        ):
+            for _ in range(2):
+                with pytest.raises(aiohttp.ClientResponseError):
+                    await client.get_persona("p1")
+            with pytest.raises(CircuitOpenError):
+                await client.get_persona("p1")
+            assert len(requests) == 2
+
+    asyncio.run(run())
+
+
+def test_trial_call_cancelled_while_queued_does_not_hold_the_trial():
+    async def run():
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        scheduler = RequestScheduler(rate=10, burst=1)
+        async with tavus_api(
+            [(200, {})], circuit_breaker=breaker, scheduler=scheduler
+        ) as (client, requests):
+            breaker.record_failure()
+            await asyncio.sleep(0.05)
+            assert breaker.state == "half-open"
+
+            # Take the only token so the next call queues
+            await scheduler.acquire("key", RequestPriority.INTERACTIVE)
+            queued = asyncio.create_task(client.get_persona("p1"))
+            await asyncio.sleep(0.01)
+            queued.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await queued
+
+            assert await client.get_persona("p2") == PERSONA
+            assert breaker.state == "closed"
+            assert requests == ["p2"]
+
+    asyncio.run(run())
+
+
+def test_429_retry_after_pauses_the_bucket():
+    async def run():
+        scheduler = RequestScheduler(rate=100, burst=10)
+        async with tavus_api(
+            [(429, {"Retry-After": "0.3"}), (200, {})], scheduler=scheduler
+        ) as (client, requests):
+            start_time = time.monotonic()
+            call = asyncio.create_task(client.get_persona("p1"))
+            while not requests:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+
+            # Calls for the same key are held too, not only the retry
+            wait = await scheduler.acquire("key", RequestPriority.INTERACTIVE)
+            assert wait >= 0.15
+
+            assert await call == PERSONA
+            assert time.monotonic() - start_time >= 0.3
+            assert requests == ["p1", "p1"]
+
+    asyncio.run(run())
+
+
+def test_429_retry_waits_for_retry_after_without_a_scheduler():
+    async def run():
+        async with tavus_api([(429, {"Retry-After": "0.2"}), (200, {})]) as (client, requests):
+            start_time = time.monotonic()
+            assert await client.get_persona("p1") == PERSONA
+            assert time.monotonic() - start_time >= 0.2
+            assert len(requests) == 2
+
+    asyncio.run(run())
+
+
+def test_interactive_calls_go_before_background_calls():
+    async def run():
+        scheduler = RequestScheduler(rate=20, burst=1)
+        await scheduler.acquire("key", RequestPriority.INTERACTIVE)
+
+        order = []
+
+        async def acquire(name, priority):
+            await scheduler.acquire("key", priority)
+            order.append(name)
+
+        background = [
+            asyncio.create_task(acquire(f"background-{i}", RequestPriority.BACKGROUND))
+            for i in range(2)
+        ]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(acquire("interactive", RequestPriority.INTERACTIVE))
+        await asyncio.gather(*background, interactive)
+
+        assert order == ["interactive", "background-0", "background-1"]
+        assert scheduler.stats["background"]["requests"] == 2
+
+    asyncio.run(run())
+
+
+def test_background_requests_are_scheduled_behind_interactive_ones():
+    async def run():
+        scheduler = RequestScheduler(rate=20, burst=1)
+        async with tavus_api([(200, {})], scheduler=scheduler) as (client, requests):
+            await scheduler.acquire("key", RequestPriority.INTERACTIVE)
+
+            async def background_call():
+                with background_requests():
+                    await client.get_persona("background")
+
+            background = asyncio.create_task(background_call())
+            await asyncio.sleep(0)
+            await asyncio.gather(background, client.get_persona("interactive"))
+
+            assert requests == ["interactive", "background"]
+
+    asyncio.run(run())